@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 
 import os
 
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
+from django.conf import settings
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'oper.settings')
 
 application = get_asgi_application()
+
+# Serve the static files like runserver does, the app is run with uvicorn (see run_command.sh)
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
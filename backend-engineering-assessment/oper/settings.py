@@ -46,7 +46,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "quiz.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
@@ -134,10 +134,58 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 STATIC_ROOT = os.path.join(PROJECT_ROOT, "staticfiles")
 STATIC_URL = "static/"
 
+# Uploaded files waiting for a background job, like the files of the import_users endpoint
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Quiz app
+# Sizes and timeouts of the in-process and Django caches used by the quiz app
+
+QUIZ_ANSWER_KEY_CACHE_SIZE = 256
+QUIZ_ANSWER_KEY_CACHE_TIMEOUT = 60 * 60
+QUIZ_ANALYTICS_CACHE_SIZE = 64
+QUIZ_ANALYTICS_CACHE_TIMEOUT = 5 * 60
+QUIZ_SNAPSHOT_CACHE_SIZE = 64
+QUIZ_SNAPSHOT_CACHE_TIMEOUT = 60 * 60
+QUIZ_ROLE_CACHE_SIZE = 4096
+QUIZ_ROLE_CACHE_TIMEOUT = 60
+QUIZ_TOKEN_CACHE_SIZE = 4096
+QUIZ_TOKEN_CACHE_TIMEOUT = 5 * 60
+QUIZ_TOKEN_CACHE_LOCAL_TIMEOUT = 30
+
+# Users per transaction of the imports queued by the import_users endpoint
+QUIZ_IMPORT_USERS_BATCH_SIZE = 1000
+
+# Acknowledge answers once they are staged, and record them with the flush_pending_answers command
+QUIZ_ANSWER_WRITE_BEHIND = False
+
+# Broker fanning out the live scoreboard events, quiz.live.CacheBroker to share them between workers through the cache
+QUIZ_LIVE_BROKER = "quiz.live.LocalBroker"
+QUIZ_LIVE_HEARTBEAT = 15
+
+# Token buckets of the participant endpoints, as (burst capacity, tokens refilled per second), None to disable a scope
+QUIZ_THROTTLE_RATES = {
+    "user": (60, 20),
+    "quiz": (5000, 1000),
+}
+
+# Capabilities granted by every role, roles also have the capabilities of the roles with a greater level
+QUIZ_ROLE_CAPABILITIES = {
+    "Creator": [
+        "create_quiz",
+        "edit_quiz",
+        "assign_quiz",
+        "view_scores",
+        "run_jobs",
+        "view_users",
+        "view_stats",
+        "create_users",
+    ],
+}
+
 
 print(os.getenv("DATABASE_URL"))
@@ -6,6 +6,7 @@ from django.contrib import admin
 
 from .models import UserQuizProgress
 from .models import AnsweredQuestion
+from .models import PendingAnswer
 from .models import AssignedQuiz
 from .models import UserProfile
 from .models import QuizStatus
@@ -13,9 +14,11 @@ from .models import Question
 from .models import Answer
 from .models import Role
 from .models import Quiz
+from .models import Job
 
 admin.site.register(UserQuizProgress)
 admin.site.register(AnsweredQuestion)
+admin.site.register(PendingAnswer)
 admin.site.register(AssignedQuiz)
 admin.site.register(UserProfile)
 admin.site.register(QuizStatus)
@@ -23,3 +26,4 @@ admin.site.register(Question)
 admin.site.register(Answer)
 admin.site.register(Role)
 admin.site.register(Quiz)
+admin.site.register(Job)
@@ -0,0 +1,168 @@
+"""
+This module contains the item analysis of quizzes.
+
+The analysis is computed from one scan over the answered questions of a quiz, ordered by participant. Only the
+selections of the current participant and fixed-size accumulators (one per question and one per answer) are held in
+memory, however many participants the quiz has.
+
+For every question it reports:
+
+- the difficulty, the share of participants who selected exactly its correct answers;
+- the pick rate of every answer;
+- the point-biserial discrimination, the correlation between answering the question correctly and the number of
+  correct answers of the participant in the whole quiz.
+"""
+
+from itertools import groupby
+from math import sqrt
+
+from django.conf import settings
+
+from .answer_key import get_quiz_version
+from .answer_key import get_answer_key
+
+from .cache import TieredCache
+
+from .models import AnsweredQuestion
+from .models import UserQuizProgress
+
+
+item_analyses = TieredCache(
+    "quiz:item_analysis",
+    maxsize=getattr(settings, "QUIZ_ANALYTICS_CACHE_SIZE", 64),
+    timeout=getattr(settings, "QUIZ_ANALYTICS_CACHE_TIMEOUT", 300),
+    ttl=getattr(settings, "QUIZ_ANALYTICS_CACHE_TIMEOUT", 300),
+)
+
+
+class ItemAccumulator:
+    """
+    This class accumulates the statistics of one question over all participants.
+    """
+
+    def __init__(self, correct, incorrect):
+        self.correct = correct
+        self.answer_picks = {answer_id: 0 for answer_id in sorted(correct | incorrect)}
+        self.correct_count = 0
+        self.correct_total = 0
+
+    def add(self, selected, total, count=1):
+        for answer_id in selected:
+            self.answer_picks[answer_id] += count
+        if selected == self.correct:
+            self.correct_count += count
+            self.correct_total += total * count
+
+    def result(self, question_id, participants, total_sum, total_square_sum):
+        difficulty = self.correct_count / participants if participants else 0.0
+        return {
+            "question_id": question_id,
+            "difficulty": difficulty,
+            "discrimination": self.discrimination(participants, total_sum, total_square_sum),
+            "answers": [
+                {
+                    "answer_id": answer_id,
+                    "is_correct": answer_id in self.correct,
+                    "pick_rate": picks / participants if participants else 0.0,
+                }
+                for answer_id, picks in self.answer_picks.items()
+            ],
+        }
+
+    def discrimination(self, participants, total_sum, total_square_sum):
+        incorrect_count = participants - self.correct_count
+        if not self.correct_count or not incorrect_count:
+            return None
+        mean = total_sum / participants
+        deviation = sqrt(max(total_square_sum / participants - mean**2, 0.0))
+        if not deviation:
+            return None
+        correct_mean = self.correct_total / self.correct_count
+        incorrect_mean = (total_sum - self.correct_total) / incorrect_count
+        share = self.correct_count / participants
+        return (correct_mean - incorrect_mean) / deviation * sqrt(share * (1 - share))
+
+
+def analyse_quiz(quiz, chunk_size=5000):
+    """
+    This function computes the item analysis of a quiz in one scan over its answered questions.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+        chunk_size (int): The number of answered questions fetched per database round trip.
+
+    Returns:
+        dict: The number of participants and the statistics of every question.
+    """
+    answer_key = get_answer_key(quiz)
+    items = {
+        question_id: ItemAccumulator(correct, incorrect)
+        for question_id, (correct, incorrect) in answer_key.questions.items()
+    }
+    participants = 0
+    total_sum = 0
+    total_square_sum = 0
+
+    rows = (
+        AnsweredQuestion.objects.filter(progress__quiz=quiz)
+        .order_by("progress_id")
+        .values_list("progress_id", "question_id", "answer_id")
+    )
+    for _, selections in groupby(rows.iterator(chunk_size=chunk_size), key=lambda row: row[0]):
+        selected = {question_id: set() for question_id in items}
+        for _, question_id, answer_id in selections:
+            if answer_key.grade(question_id, answer_id) is not None:
+                selected[question_id].add(answer_id)
+
+        total = answer_key.incorrect_answers
+        for question_id, answer_ids in selected.items():
+            correct = items[question_id].correct
+            total += len(answer_ids & correct) - len(answer_ids - correct)
+        for question_id, answer_ids in selected.items():
+            items[question_id].add(answer_ids, total)
+
+        participants += 1
+        total_sum += total
+        total_square_sum += total**2
+
+    # Participants without any answer did not show up in the scan, they all have the same selections
+    silent = UserQuizProgress.objects.filter(quiz=quiz).count() - participants
+    if silent > 0:
+        total = answer_key.incorrect_answers
+        for item in items.values():
+            item.add(set(), total, count=silent)
+        participants += silent
+        total_sum += total * silent
+        total_square_sum += total**2 * silent
+
+    return {
+        "participants": participants,
+        "questions": [
+            item.result(question_id, participants, total_sum, total_square_sum) for question_id, item in items.items()
+        ],
+    }
+
+
+def get_item_analysis(quiz):
+    """
+    This function returns the item analysis of a quiz, computing it if it is not cached yet.
+
+    Cached analyses are dropped when the status of the quiz changes, and expire after
+    ``QUIZ_ANALYTICS_CACHE_TIMEOUT`` seconds so answers of a running quiz are eventually included.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+
+    Returns:
+        dict: The item analysis of the quiz.
+    """
+    if quiz.status.name == "Draft":
+        return analyse_quiz(quiz)
+
+    cached = item_analyses.get(quiz.id)
+    if cached is not None and cached[0] == get_quiz_version(quiz):
+        return cached[1]
+
+    analysis = analyse_quiz(quiz)
+    item_analyses.set(quiz.id, (get_quiz_version(quiz), analysis))
+    return analysis
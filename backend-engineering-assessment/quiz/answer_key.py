@@ -0,0 +1,130 @@
+"""
+This module contains the compiled answer keys of quizzes.
+
+Once a quiz left the Draft status its questions and answers can no longer change, so the answer key is compiled once
+and cached in process and in the Django cache. Every cached answer key carries the ``updated_at`` timestamp of its
+quiz, which changes with every status change, so an answer key compiled for an older status is never used.
+"""
+
+from django.conf import settings
+
+from .cache import TieredCache
+
+from .models import Question
+from .models import Answer
+
+
+answer_keys = TieredCache(
+    "quiz:answer_key",
+    maxsize=getattr(settings, "QUIZ_ANSWER_KEY_CACHE_SIZE", 256),
+    timeout=getattr(settings, "QUIZ_ANSWER_KEY_CACHE_TIMEOUT", 3600),
+)
+
+
+class AnswerKey:
+    """
+    This class maps the questions of a quiz to their correct and incorrect answer IDs.
+    """
+
+    def __init__(self, quiz_id, version, questions):
+        self.quiz_id = quiz_id
+        self.version = version
+        # question id -> (correct answer ids, incorrect answer ids)
+        self.questions = questions
+        # answer id -> (question id, is correct)
+        self.answers = {}
+        for question_id, (correct, incorrect) in questions.items():
+            for answer_id in correct:
+                self.answers[answer_id] = (question_id, True)
+            for answer_id in incorrect:
+                self.answers[answer_id] = (question_id, False)
+
+        self.total_questions = len(questions)
+        self.total_answers = len(self.answers)
+        self.incorrect_answers = sum(len(incorrect) for _, incorrect in questions.values())
+
+    @property
+    def totals(self):
+        return {
+            "total_questions": self.total_questions,
+            "total_answers": self.total_answers,
+            "incorrect_answers": self.incorrect_answers,
+        }
+
+    def grade(self, question_id, answer_id):
+        """
+        This function grades the selection of an answer for a question.
+
+        Args:
+            question_id (int): The ID of the question.
+            answer_id (int): The ID of the selected answer.
+
+        Returns:
+            bool: Whether the answer is correct, or None if it does not belong to the question.
+        """
+        answer = self.answers.get(answer_id)
+        if answer is None or answer[0] != question_id:
+            return None
+        return answer[1]
+
+
+def get_quiz_version(quiz):
+    return quiz.updated_at.isoformat() if quiz.updated_at else None
+
+
+def compile_answer_key(quiz):
+    """
+    This function compiles the answer key of a quiz from the database.
+
+    Args:
+        quiz (Quiz): The quiz to compile the answer key for.
+
+    Returns:
+        AnswerKey: The compiled answer key.
+    """
+    question_ids = Question.objects.filter(quiz=quiz).values_list("id", flat=True)
+    questions = {question_id: (set(), set()) for question_id in question_ids}
+    for answer_id, question_id, is_correct in Answer.objects.filter(question__quiz=quiz).values_list(
+        "id", "question_id", "is_correct"
+    ):
+        questions[question_id][0 if is_correct else 1].add(answer_id)
+
+    questions = {
+        question_id: (frozenset(correct), frozenset(incorrect))
+        for question_id, (correct, incorrect) in questions.items()
+    }
+    return AnswerKey(quiz.id, get_quiz_version(quiz), questions)
+
+
+def get_answer_key(quiz):
+    """
+    This function returns the answer key of a quiz, compiling it if it is not cached yet.
+
+    The answer keys of quizzes in Draft status are never cached, since their content can still change.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+
+    Returns:
+        AnswerKey: The answer key of the quiz.
+    """
+    if quiz.status.name == "Draft":
+        return compile_answer_key(quiz)
+
+    answer_key = answer_keys.get(quiz.id)
+    if answer_key is None or answer_key.version != get_quiz_version(quiz):
+        answer_key = compile_answer_key(quiz)
+        answer_keys.set(quiz.id, answer_key)
+    return answer_key
+
+
+def invalidate_answer_key(quiz):
+    """
+    This function removes the cached answer key of a quiz, and compiles it again if the quiz is Published.
+
+    Args:
+        quiz (Quiz): The quiz whose status changed.
+    """
+    answer_keys.delete(quiz.id)
+    if quiz.status.name == "Published":
+        answer_keys.set(quiz.id, compile_answer_key(quiz))
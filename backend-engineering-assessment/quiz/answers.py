@@ -0,0 +1,208 @@
+"""
+This module contains the logic to record the answers of participants.
+"""
+
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import OuterRef
+from django.db.models import Subquery
+
+from .answer_key import get_answer_key
+
+from .scoring import increment_counters
+
+from .live import publish_progress_score
+
+from .models import AnsweredQuestion
+from .models import UserQuizProgress
+from .models import Question
+from .models import Answer
+
+
+# The largest number of answers accepted in one batch
+MAX_BATCH_SIZE = 100
+
+
+def resolve_submission(user, question_id, answer_id):
+    """
+    This function resolves a submitted answer with one query.
+
+    The answer is joined to its question, the quiz and its status, and annotated with the ID of the participant's
+    progress in the quiz as ``progress_id``. An answer of another question is not resolved.
+
+    Args:
+        user (User): The participant.
+        question_id (int): The ID of the answered question.
+        answer_id (int): The ID of the selected answer.
+
+    Returns:
+        Answer: The answer, or None if there is no such answer to the question.
+    """
+    progresses = UserQuizProgress.objects.filter(user=user, quiz=OuterRef("question__quiz")).values("id")[:1]
+    return (
+        Answer.objects.select_related("question__quiz__status")
+        .annotate(progress_id=Subquery(progresses))
+        .filter(id=answer_id, question_id=question_id)
+        .first()
+    )
+
+
+def lock_progress(user_progress_id):
+    """
+    This function locks the progress of a participant until the end of the transaction.
+
+    Answers are recorded under this lock, before anything is read, so concurrent submissions and flushes of the same
+    participant are serialized: the answers read as already recorded are the only ones, and every inserted answer is
+    counted exactly once.
+
+    Args:
+        user_progress_id (int): The ID of the progress.
+    """
+    UserQuizProgress.objects.select_for_update().filter(id=user_progress_id).values_list("id", flat=True).first()
+
+
+def record_answer(user_progress, question, answer):
+    """
+    This function records an answer of a participant and updates the counters of their progress.
+
+    The answer insert and the counter update happen in the same transaction, under the lock of the progress. The
+    answer is inserted without checking first, the unique constraint on the answered questions rejects it if it was
+    already recorded. Recording an answer that was already recorded only moves the progress and its cursor to the
+    question again.
+
+    Args:
+        user_progress (UserQuizProgress): The progress of the participant.
+        question (Question): The answered question, ideally fetched with its quiz and the quiz status.
+        answer (Answer): The selected answer.
+
+    Returns:
+        tuple: The answered question and whether it was newly created.
+    """
+    answered_question = AnsweredQuestion(progress=user_progress, question=question, answer=answer)
+    with transaction.atomic():
+        lock_progress(user_progress.id)
+        try:
+            with transaction.atomic():
+                # bulk inserted so that no signal counts it, it is counted below along with the move of the cursor
+                AnsweredQuestion.objects.bulk_create([answered_question])
+        except IntegrityError:
+            # since multiple answers can be correct for one question, answering again is not an error
+            UserQuizProgress.objects.filter(id=user_progress.id).update(
+                last_answered_question=question, cursor=question.position
+            )
+            answered_question = AnsweredQuestion.objects.get(progress=user_progress, question=question, answer=answer)
+            return answered_question, False
+
+        count_answered_question(
+            answered_question, question.quiz, last_answered_question=question, cursor=question.position
+        )
+    return answered_question, True
+
+
+def count_answered_question(answered_question, quiz, **fields):
+    """
+    This function accounts for a newly recorded answer in the counters of its progress.
+
+    It has to be called in the transaction that inserted the answer.
+
+    Args:
+        answered_question (AnsweredQuestion): The recorded answer.
+        quiz (Quiz): The quiz of the progress, ideally fetched with its status.
+        **fields: Other fields of the progress to update in the same statement.
+    """
+    question_is_new = (
+        not AnsweredQuestion.objects.filter(
+            progress_id=answered_question.progress_id, question_id=answered_question.question_id
+        )
+        .exclude(id=answered_question.id)
+        .exists()
+    )
+
+    # answers of another question are recorded, but never count towards the score
+    answer_key = get_answer_key(quiz)
+    is_correct = answer_key.grade(answered_question.question_id, answered_question.answer_id)
+    increment_counters(
+        answered_question.progress_id,
+        answer_key.total_questions,
+        questions_answered=int(question_is_new),
+        correct_selections=int(is_correct is True),
+        wrong_selections=int(is_correct is False),
+        **fields,
+    )
+    publish_progress_score(quiz.id, answered_question.progress_id)
+
+
+def record_answers(user_progress, selections):
+    """
+    This function records a batch of answers of a participant and updates the counters of their progress once.
+
+    The selections are validated with one query each for their questions, their answers with the question they
+    belong to, and the answers already recorded, inserted with one bulk insert, and accounted for with one counter
+    update, all in one transaction. Selections that cannot be recorded are reported and skipped, they do not fail the
+    batch.
+
+    Args:
+        user_progress (UserQuizProgress): The progress of the participant, ideally fetched with its quiz status.
+        selections (list): The selected answers, as (question ID, answer ID) pairs.
+
+    Returns:
+        list: The result of every selection, in the order of the selections.
+    """
+    question_ids = {question_id for question_id, _ in selections}
+    answer_ids = {answer_id for _, answer_id in selections}
+
+    with transaction.atomic():
+        lock_progress(user_progress.id)
+        positions = dict(
+            Question.objects.filter(quiz_id=user_progress.quiz_id, id__in=question_ids).values_list("id", "position")
+        )
+        answer_questions = dict(Answer.objects.filter(id__in=answer_ids).values_list("id", "question_id"))
+        recorded = set(
+            AnsweredQuestion.objects.filter(progress=user_progress, question_id__in=positions).values_list(
+                "question_id", "answer_id"
+            )
+        )
+        answered_questions = {question_id for question_id, _ in recorded}
+
+        results = []
+        answered = []
+        last_question_id = None
+        for question_id, answer_id in selections:
+            result = {"question_id": question_id, "answer_id": answer_id}
+            if question_id not in positions:
+                result.update(status="rejected", error="Question does not belong to the quiz.")
+            elif answer_id not in answer_questions:
+                result.update(status="rejected", error="Answer does not exist.")
+            elif answer_questions[answer_id] != question_id:
+                result.update(status="rejected", error="Answer does not belong to the question.")
+            elif (question_id, answer_id) in recorded:
+                # since multiple answers can be correct for one question, answering again is not an error
+                result["status"] = "already_recorded"
+                last_question_id = question_id
+            else:
+                recorded.add((question_id, answer_id))
+                answered.append(AnsweredQuestion(progress=user_progress, question_id=question_id, answer_id=answer_id))
+                result["status"] = "created"
+                last_question_id = question_id
+            results.append(result)
+
+        if last_question_id is None:
+            return results
+
+        # the recorded answers were skipped above and the progress is locked, the constraint cannot be hit
+        AnsweredQuestion.objects.bulk_create(answered)
+
+        answer_key = get_answer_key(user_progress.quiz)
+        grades = [answer_key.grade(row.question_id, row.answer_id) for row in answered]
+        increment_counters(
+            user_progress.id,
+            answer_key.total_questions,
+            questions_answered=len({row.question_id for row in answered} - answered_questions),
+            correct_selections=grades.count(True),
+            wrong_selections=grades.count(False),
+            last_answered_question_id=last_question_id,
+            cursor=positions[last_question_id],
+        )
+        if answered:
+            publish_progress_score(user_progress.quiz_id, user_progress.id)
+    return results
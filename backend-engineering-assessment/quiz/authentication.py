@@ -0,0 +1,108 @@
+"""
+This module contains the authentication classes of the quiz app.
+
+``CachedTokenAuthentication`` is a drop-in replacement for DRF's ``TokenAuthentication``. A token is looked up with its
+user once, then only the ID and the role of the user are cached, in process and in the Django cache, so authenticating
+a request normally costs no query. The cache keys are hashes of the tokens, so neither the tokens nor anything secret
+about their users is ever written to a shared cache. Deleting a token, or saving its user or their profile,
+invalidates it through signals. Other processes may keep accepting a deleted token for at most
+``QUIZ_TOKEN_CACHE_LOCAL_TIMEOUT`` seconds, until their own entry times out.
+"""
+
+from hashlib import sha256
+
+from django.conf import settings
+from django.db import router
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import TieredCache
+
+from .roles import get_user_role
+from .roles import role_cache
+from .roles import MISSING
+
+from .models import User
+
+
+tokens = TieredCache(
+    "quiz:token",
+    maxsize=getattr(settings, "QUIZ_TOKEN_CACHE_SIZE", 4096),
+    timeout=getattr(settings, "QUIZ_TOKEN_CACHE_TIMEOUT", 300),
+    ttl=getattr(settings, "QUIZ_TOKEN_CACHE_LOCAL_TIMEOUT", 30),
+)
+
+
+def token_cache_key(key):
+    """
+    This function returns the cache key of a token.
+
+    Args:
+        key (str): The token.
+
+    Returns:
+        str: The hash of the token.
+    """
+    return sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """
+    This function removes a token from the cache.
+
+    Args:
+        key (str): The token.
+    """
+    tokens.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    """
+    This function removes all tokens of a user from the cache.
+
+    Args:
+        user_id (int): The ID of the user.
+    """
+    for key in Token.objects.filter(user_id=user_id).values_list("key", flat=True):
+        invalidate_token(key)
+
+
+def build_user(user_id):
+    """
+    This function builds the user of a cached token without a query.
+
+    Only the ID of the user is known, every other field is deferred and loaded from the database when it is read, and
+    saving the user only writes the fields that were loaded.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        User: The user.
+    """
+    # inactive users are never cached, and deactivating a user invalidates their tokens
+    return User.from_db(router.db_for_read(User), ["id", "is_active"], [user_id, True])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    This class authenticates requests with tokens like ``TokenAuthentication``, caching the ID and role of their users.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = tokens.get(cache_key)
+        if cached is None:
+            # unknown and inactive tokens are refused here, and never cached
+            user, token = super().authenticate_credentials(key)
+            role = get_user_role(user.id)
+            tokens.set(cache_key, (user.id, role if isinstance(role, str) else None))
+            return user, token
+
+        user_id, role = cached
+        if role is not None and role_cache.get(user_id, MISSING) is MISSING:
+            # the role comes with the token to other processes, so their role checks cost no query either
+            role_cache.set(user_id, role)
+        user = build_user(user_id)
+        return user, Token(key=key, user=user)
@@ -0,0 +1,111 @@
+"""
+This module contains the write-behind buffer of answers.
+
+When ``QUIZ_ANSWER_WRITE_BEHIND`` is enabled, a submitted answer is only appended to the ``PendingAnswer`` table and
+acknowledged. That is a single insert, without the counter, cursor and histogram updates of recording an answer, so
+the submissions of a live quiz hold the database write lock as briefly as possible. The ``flush_pending_answers``
+command records the pending answers in batches, and the reads of a participant's own progress include the answers
+that are still pending.
+"""
+
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+
+from .answer_key import get_answer_key
+
+from .answers import record_answers
+
+from .scoring import build_score
+
+from .models import AnsweredQuestion
+from .models import UserQuizProgress
+from .models import PendingAnswer
+
+
+def write_behind_enabled():
+    """
+    This function tells whether submitted answers are buffered.
+
+    Returns:
+        bool: Whether ``QUIZ_ANSWER_WRITE_BEHIND`` is enabled.
+    """
+    return getattr(settings, "QUIZ_ANSWER_WRITE_BEHIND", False)
+
+
+def buffer_answer(user_progress, question, answer):
+    """
+    This function appends a submitted answer to the buffer.
+
+    Args:
+        user_progress (UserQuizProgress): The progress of the participant.
+        question (Question): The answered question.
+        answer (Answer): The selected answer.
+
+    Returns:
+        PendingAnswer: The pending answer.
+    """
+    return PendingAnswer.objects.create(progress=user_progress, question=question, answer=answer)
+
+
+def flush_pending_answers(batch_size=1000):
+    """
+    This function records the oldest pending answers and removes them from the buffer.
+
+    The answers of every participant are recorded with ``record_answers`` in the order they were submitted, so each
+    progress is updated once per flush. The whole batch is flushed in one transaction.
+
+    Args:
+        batch_size (int): The largest number of pending answers to flush.
+
+    Returns:
+        int: The number of flushed pending answers.
+    """
+    with transaction.atomic():
+        pending = PendingAnswer.objects.order_by("id").values_list("id", "progress_id", "question_id", "answer_id")
+        pending = list(pending[:batch_size])
+        if not pending:
+            return 0
+
+        progress_ids = {progress_id for _, progress_id, _, _ in pending}
+        user_progresses = UserQuizProgress.objects.select_related("quiz__status").in_bulk(progress_ids)
+        # the sort is stable, the answers of every participant stay in submission order
+        for progress_id, rows in groupby(sorted(pending, key=lambda row: row[1]), key=lambda row: row[1]):
+            selections = [(question_id, answer_id) for _, _, question_id, answer_id in rows]
+            record_answers(user_progresses[progress_id], selections)
+
+        PendingAnswer.objects.filter(id__in=[pending_id for pending_id, _, _, _ in pending]).delete()
+    return len(pending)
+
+
+def buffered_progress_score(user_progress):
+    """
+    This function computes the score summary of a user's progress, including their pending answers.
+
+    Args:
+        user_progress (UserQuizProgress): The progress to score, ideally fetched with its quiz and the quiz status.
+
+    Returns:
+        dict: The score summary of the user.
+    """
+    answer_key = get_answer_key(user_progress.quiz)
+    questions_answered = user_progress.questions_answered
+    correct_selections = user_progress.correct_selections
+    wrong_selections = user_progress.wrong_selections
+
+    pending = set(PendingAnswer.objects.filter(progress=user_progress).values_list("question_id", "answer_id"))
+    if pending:
+        recorded = set(
+            AnsweredQuestion.objects.filter(
+                progress=user_progress, question_id__in={question_id for question_id, _ in pending}
+            ).values_list("question_id", "answer_id")
+        )
+        new = pending - recorded
+        grades = [answer_key.grade(question_id, answer_id) for question_id, answer_id in new]
+        new_questions = {question_id for question_id, _ in new} - {question_id for question_id, _ in recorded}
+        questions_answered += len(new_questions)
+        correct_selections += grades.count(True)
+        wrong_selections += grades.count(False)
+
+    return build_score(answer_key.totals, questions_answered, correct_selections, wrong_selections)
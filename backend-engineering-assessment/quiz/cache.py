@@ -0,0 +1,105 @@
+"""
+This module contains the in-process caches of the quiz app.
+
+``LocalCache`` is a bounded, thread-safe LRU cache living in the memory of one process. ``TieredCache`` puts a
+``LocalCache`` in front of the Django cache, so values are shared between processes but usually read without any
+network round trip.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+import time
+
+from django.core.cache import cache
+
+
+class LocalCache:
+    """
+    This class is a bounded LRU cache with an optional time to live.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] < time.monotonic()):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        This function returns the hit and miss counters of the cache.
+
+        Returns:
+            dict: The number of hits and misses, the hit rate and the number of entries.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+
+class TieredCache:
+    """
+    This class caches values in process and in the Django cache.
+    """
+
+    def __init__(self, prefix, maxsize=1024, timeout=None, ttl=None):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.local = LocalCache(maxsize=maxsize, ttl=ttl)
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = cache.get(self._key(key))
+        if value is None:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        cache.set(self._key(key), value, self.timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        cache.delete(self._key(key))
+
+    def clear_local(self):
+        self.local.clear()
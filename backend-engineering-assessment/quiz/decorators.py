@@ -1,20 +1,25 @@
 """
-This module contains decorators that can be used to restrict access to views based on the user's role.
+This module contains decorators that can be used to restrict access to views based on the capabilities of the user's
+role, and to answer conditional requests of views without building their response.
 
 Written by: Moritz Patek | patekmoritz@yahoo.at
 """
 
 from functools import wraps
 from django.http import JsonResponse
-from .models import UserProfile
+from django.db.models import Count
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from .roles import get_request_capabilities
+from .roles import NO_PROFILE
 
 
-def role_required(required_role):
+def capability_required(capability):
     """
-    This decorator restricts access to views based on the user's role.
+    This decorator restricts access to views to the users whose role has a capability.
 
     Args:
-        required_role (str): The role required to access the view.
+        capability (Capability): The capability required to access the view.
 
     Returns:
         function: The wrapped view function.
@@ -26,19 +31,81 @@ def role_required(required_role):
             if not request.user.is_authenticated:
                 return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
 
-            # Get the user's role
-            try:
-                user_profile = UserProfile.objects.get(user=request.user)
-                user_role = user_profile.role.name if user_profile.role else None
-
-                # Check if the user has the required role
-                if user_role != required_role:
-                    return JsonResponse({"error": "You do not have permission to perform this action."}, status=403)
-            except UserProfile.DoesNotExist:
+            # Get the user's capabilities, usually from the cache
+            capabilities = get_request_capabilities(request)
+            if capabilities is NO_PROFILE:
                 return JsonResponse({"error": "User profile does not exist."}, status=403)
 
+            if not capabilities & capability:
+                return JsonResponse({"error": "You do not have permission to perform this action."}, status=403)
+
             return view_func(request, *args, **kwargs)
 
         return _wrapped_view
 
     return decorator
+
+
+def content_version(queryset):
+    """
+    This function computes a cheap validator of the rows of a queryset, from their number and latest update.
+
+    The number of rows changes when a row is deleted, which the latest update alone would not show. For the same
+    reason there is no Last-Modified validator, deleting the latest updated row would make it go back in time.
+
+    Args:
+        queryset (QuerySet): The rows served by a view, of a model with an ``updated_at`` field.
+
+    Returns:
+        str: The ETag of the rows.
+    """
+    version = queryset.order_by().aggregate(rows=Count("id"), updated_at=Max("updated_at"))
+    if version["updated_at"] is None:
+        return f'W/"{version["rows"]}"'
+    return f'W/"{version["rows"]}-{version["updated_at"].timestamp()}"'
+
+
+def conditional_response(request, etag, get_response):
+    """
+    This function answers a conditional GET request with a 304 response, or builds the response if it is needed.
+
+    Args:
+        request (Request): The request, with its If-None-Match header.
+        etag (str): The ETag of the content, as returned by ``content_version``.
+        get_response (function): Builds the response, only called if the client does not have the content yet.
+
+    Returns:
+        HttpResponse: The 304 response or the built response, with the ETag header.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = get_response()
+    if response.status_code in (200, 304):
+        response["ETag"] = etag
+    return response
+
+
+def conditional(get_etag):
+    """
+    This decorator answers conditional GET requests of a view with 304 responses before the view runs.
+
+    It has to be applied below the decorators that restrict access to the view.
+
+    Args:
+        get_etag (function): Computes the ETag of the content of the view from the request, usually with
+            ``content_version``.
+
+    Returns:
+        function: The wrapped view function.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            return conditional_response(
+                request, get_etag(request, *args, **kwargs), lambda: view_func(request, *args, **kwargs)
+            )
+
+        return _wrapped_view
+
+    return decorator
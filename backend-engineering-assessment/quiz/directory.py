@@ -0,0 +1,99 @@
+"""
+This module contains the keyset pagination and prefix search of users.
+
+Users are listed by username. Every page ends with a cursor holding the last username, and the next page continues
+right after it, so any page costs one range query on the username index. The search matches a prefix of the username
+or of the email, with the index of each column, and the role and profile of every user are fetched with the same query.
+"""
+
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+import json
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import User
+
+
+def encode_cursor(user):
+    """
+    This function encodes the position after a user into an opaque cursor.
+
+    Args:
+        user (User): The last user of a page.
+
+    Returns:
+        str: The cursor.
+    """
+    return urlsafe_b64encode(json.dumps({"username": user.username}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    This function decodes a cursor created by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        str: The username of the last user of the previous page.
+
+    Raises:
+        ValueError: If the cursor is not valid.
+    """
+    try:
+        username = json.loads(urlsafe_b64decode(cursor.encode()))["username"]
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(username, str):
+        raise ValueError("Invalid cursor.")
+    return username
+
+
+def prefix_filter(field, prefix):
+    """
+    This function builds the filter selecting the values of a column that start with a prefix.
+
+    Args:
+        field (str): The name of the column.
+        prefix (str): The prefix.
+
+    Returns:
+        Q: The filter.
+    """
+    lookup = Q(**{f"{field}__startswith": prefix})
+    if connection.vendor == "sqlite":
+        # LIKE is case-insensitive in SQLite and cannot use the index, the same prefix as a range of the binary
+        # collation can
+        lookup &= Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + "\U0010ffff"})
+    return lookup
+
+
+def get_users_page(search=None, role=None, cursor=None, page_size=50):
+    """
+    This function returns one page of users, ordered by username.
+
+    Args:
+        search (str, optional): The prefix of the username or email of the users.
+        role (str, optional): The name of the role of the users.
+        cursor (str, optional): The cursor returned with the previous page.
+        page_size (int): The number of users per page.
+
+    Returns:
+        dict: The users of the page and the cursor of the next page, if there is one.
+
+    Raises:
+        ValueError: If the cursor is not valid.
+    """
+    users = User.objects.select_related("userprofile__role")
+    if search:
+        users = users.filter(prefix_filter("username", search) | prefix_filter("email", search))
+    if role:
+        users = users.filter(userprofile__role__name=role)
+    if cursor:
+        users = users.filter(username__gt=decode_cursor(cursor))
+
+    users = list(users.order_by("username")[: page_size + 1])
+    next_cursor = encode_cursor(users[page_size - 1]) if len(users) > page_size else None
+    return {"results": users[:page_size], "next_cursor": next_cursor}
@@ -0,0 +1,85 @@
+"""
+This module contains the streaming exports of quiz scores.
+
+The rows are read from the score counters with a server-side cursor and written out one at a time, so the memory used
+by an export does not depend on the number of participants.
+"""
+
+import json
+import csv
+
+from .scoring import get_quiz_totals
+from .scoring import build_score
+
+from .models import UserQuizProgress
+
+
+EXPORT_FIELDS = ["user", "completed", "questions_answered", "total_questions", "correct_answers", "total_answers"]
+
+
+class Echo:
+    """
+    This class is a file-like object that returns what is written to it, so csv.writer can produce single lines.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_quiz_scores(quiz, chunk_size=2000):
+    """
+    This function yields the score summaries of all participants of a quiz, one at a time.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+        chunk_size (int): The number of participants fetched per database round trip.
+
+    Yields:
+        dict: The score summary of one participant.
+    """
+    totals = get_quiz_totals(quiz)
+    user_progresses = (
+        UserQuizProgress.objects.filter(quiz=quiz)
+        .order_by("id")
+        .values_list("user__username", "questions_answered", "correct_selections", "wrong_selections")
+    )
+    for username, questions_answered, correct_selections, wrong_selections in user_progresses.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {"user": username, **build_score(totals, questions_answered, correct_selections, wrong_selections)}
+
+
+def stream_csv(rows):
+    """
+    This function turns score summaries into CSV lines, starting with the header.
+
+    Args:
+        rows (iterable): The score summaries.
+
+    Yields:
+        str: One CSV line.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def stream_ndjson(rows):
+    """
+    This function turns score summaries into newline-delimited JSON.
+
+    Args:
+        rows (iterable): The score summaries.
+
+    Yields:
+        str: One JSON document per line.
+    """
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
@@ -0,0 +1,188 @@
+"""
+This module contains the bulk grading of quizzes.
+
+The answered questions of all participants of a quiz are loaded into a participants x answers boolean matrix. Since a
+selected correct answer and an unselected wrong answer both count as correct, the number of correct answers of every
+participant is a single comparison of that matrix with the answer key vector. The per-question statistics are computed
+from the same matrix.
+"""
+
+from django.db.models.functions import Now
+
+import numpy as np
+
+from .answer_key import get_answer_key
+
+from .histogram import rebuild_score_histogram
+
+from .models import AnsweredQuestion
+from .models import UserQuizProgress
+
+
+class QuizGrades:
+    """
+    This class holds the grades of all participants of a quiz.
+    """
+
+    def __init__(
+        self, answer_key, progress_ids, usernames, answer_ids, answer_questions, selections, questions_answered
+    ):
+        self.answer_key = answer_key
+        self.progress_ids = progress_ids
+        self.usernames = usernames
+        self.answer_ids = answer_ids
+        self.answer_questions = answer_questions
+        self.is_correct = np.array([answer_key.answers[answer_id][1] for answer_id in answer_ids], dtype=bool)
+        self.selections = selections
+
+        # The grading itself: one comparison against the answer key vector
+        self.matches = selections == self.is_correct
+        self.correct_answers = self.matches.sum(axis=1)
+        self.correct_selections = (selections & self.is_correct).sum(axis=1)
+        self.wrong_selections = (selections & ~self.is_correct).sum(axis=1)
+        self.questions_answered = questions_answered
+
+    def scores(self):
+        """
+        This function returns the score summaries of all participants, in the shape of ``get_quiz_scores``.
+
+        Returns:
+            list: The score summaries of all participants, in the order they joined the quiz.
+        """
+        total_questions = self.answer_key.total_questions
+        total_answers = self.answer_key.total_answers
+        return [
+            {
+                "user": username,
+                "completed": bool(questions_answered == total_questions),
+                "questions_answered": int(questions_answered),
+                "total_questions": total_questions,
+                "correct_answers": int(correct_answers),
+                "total_answers": total_answers,
+            }
+            for username, questions_answered, correct_answers in zip(
+                self.usernames, self.questions_answered, self.correct_answers
+            )
+        ]
+
+    def question_statistics(self):
+        """
+        This function returns per-question statistics of the quiz.
+
+        A participant answered a question fully correctly if they selected exactly its correct answers. A question
+        without answers is answered fully correctly by everyone, like in the scoring rules and the item analysis.
+
+        Returns:
+            list: For every question, the share of participants who answered it fully correctly and the pick rate of
+            each of its answers.
+        """
+        participants = len(self.progress_ids)
+        pick_counts = self.selections.sum(axis=0)
+
+        statistics = []
+        for question_id in self.answer_key.questions:
+            columns = np.flatnonzero(self.answer_questions == question_id)
+            # with no columns, all() is true for every participant
+            fully_correct = self.matches[:, columns].all(axis=1).sum()
+            statistics.append(
+                {
+                    "question_id": question_id,
+                    "correct_rate": float(fully_correct / participants) if participants else 0.0,
+                    "answers": [
+                        {
+                            "answer_id": int(self.answer_ids[column]),
+                            "is_correct": bool(self.is_correct[column]),
+                            "pick_rate": float(pick_counts[column] / participants) if participants else 0.0,
+                        }
+                        for column in columns
+                    ],
+                }
+            )
+        return statistics
+
+
+def grade_quiz(quiz, chunk_size=10000):
+    """
+    This function grades all participants of a quiz at once.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+        chunk_size (int): The number of answered questions fetched per database round trip.
+
+    Returns:
+        QuizGrades: The grades of all participants.
+    """
+    answer_key = get_answer_key(quiz)
+
+    # The participants are the rows of the matrix
+    progresses = UserQuizProgress.objects.filter(quiz=quiz).order_by("id").values_list("id", "user__username")
+    progress_ids, usernames = (list(column) for column in zip(*progresses)) if progresses else ([], [])
+    progress_ids = np.array(progress_ids, dtype=np.int64)
+
+    # The answers are the columns of the matrix, grouped by question
+    answer_ids = np.array(sorted(answer_key.answers, key=lambda a: (answer_key.answers[a][0], a)), dtype=np.int64)
+    answer_questions = np.array([answer_key.answers[answer_id][0] for answer_id in answer_ids], dtype=np.int64)
+    answer_order = np.argsort(answer_ids)
+
+    rows = AnsweredQuestion.objects.filter(progress__quiz=quiz).values_list("progress_id", "question_id", "answer_id")
+    answered = np.fromiter(
+        (value for row in rows.iterator(chunk_size=chunk_size) for value in row), dtype=np.int64
+    ).reshape(-1, 3)
+
+    selections = np.zeros((len(progress_ids), len(answer_ids)), dtype=bool)
+    questions_answered = np.zeros(len(progress_ids), dtype=np.int64)
+    if len(answered) and len(progress_ids):
+        row_index = np.searchsorted(progress_ids, answered[:, 0])
+
+        # A question counts as answered once, however many answers were recorded for it
+        pairs = np.unique(answered[:, :2], axis=0)
+        questions_answered = np.bincount(np.searchsorted(progress_ids, pairs[:, 0]), minlength=len(progress_ids))
+
+        # Only answers that belong to the question they were recorded for are selections
+        if len(answer_ids):
+            position = np.searchsorted(answer_ids[answer_order], answered[:, 2]).clip(max=len(answer_ids) - 1)
+            column_index = answer_order[position]
+            valid = (answer_ids[column_index] == answered[:, 2]) & (answer_questions[column_index] == answered[:, 1])
+            selections[row_index[valid], column_index[valid]] = True
+
+    return QuizGrades(
+        answer_key, progress_ids, usernames, answer_ids, answer_questions, selections, questions_answered
+    )
+
+
+def save_grades(grades, batch_size=1000):
+    """
+    This function writes the grades of a quiz back to the score counters of its participants and its score histogram.
+
+    Args:
+        grades (QuizGrades): The grades to save.
+        batch_size (int): The number of progresses to update per query.
+
+    Returns:
+        int: The number of updated progresses.
+    """
+    total_questions = grades.answer_key.total_questions
+    user_progresses = [
+        UserQuizProgress(
+            id=int(progress_id),
+            questions_answered=int(questions_answered),
+            correct_selections=int(correct_selections),
+            wrong_selections=int(wrong_selections),
+            score=int(correct_answers),
+            completed=bool(questions_answered == total_questions),
+        )
+        for progress_id, questions_answered, correct_selections, wrong_selections, correct_answers in zip(
+            grades.progress_ids,
+            grades.questions_answered,
+            grades.correct_selections,
+            grades.wrong_selections,
+            grades.correct_answers,
+        )
+    ]
+    fields = ["questions_answered", "correct_selections", "wrong_selections", "score", "completed"]
+    UserQuizProgress.objects.bulk_update(user_progresses, fields, batch_size=batch_size)
+    UserQuizProgress.objects.filter(
+        quiz=grades.answer_key.quiz_id, completed=True, completed_at__isnull=True
+    ).update(completed_at=Now())
+    rebuild_score_histogram(grades.answer_key.quiz_id)
+    return len(user_progresses)
@@ -0,0 +1,149 @@
+"""
+This module contains the score histograms of quizzes.
+
+Every quiz has one ``QuizScoreBucket`` per distinct score, holding the number of participants with that score. The
+buckets are moved incrementally whenever the score of a participant changes, so the rank and percentile of a
+participant are found with a binary search over the sorted buckets instead of a scan over all participants. A quiz has
+at most one bucket per possible score, however many participants it has.
+
+The buckets of a quiz are shared by all its participants. The moves caused by answers are applied once the answers are
+committed, each in its own short transaction, so concurrent answers only wait for each other on the buckets for the
+duration of one move, not of the whole transaction recording an answer.
+"""
+
+from bisect import bisect_left
+from bisect import bisect_right
+from itertools import accumulate
+from functools import partial
+
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+
+from .models import UserQuizProgress
+from .models import QuizScoreBucket
+
+
+def add_score(quiz_id, score, count=1):
+    """
+    This function adds participants to the bucket of a score.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        score (int): The score of the participants.
+        count (int): The number of participants to add.
+    """
+    bucket = QuizScoreBucket.objects.filter(quiz_id=quiz_id, score=score)
+    if bucket.update(participants=F("participants") + count):
+        return
+    try:
+        with transaction.atomic():
+            QuizScoreBucket.objects.create(quiz_id=quiz_id, score=score, participants=count)
+    except IntegrityError:
+        # another participant reached the score at the same time and created the bucket first
+        bucket.update(participants=F("participants") + count)
+
+
+def remove_score(quiz_id, score, count=1):
+    """
+    This function removes participants from the bucket of a score.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        score (int): The score of the participants.
+        count (int): The number of participants to remove.
+    """
+    QuizScoreBucket.objects.filter(quiz_id=quiz_id, score=score).update(participants=F("participants") - count)
+
+
+def move_score(quiz_id, old_score, new_score):
+    """
+    This function moves a participant from the bucket of their old score to the bucket of their new score.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        old_score (int): The score before the update.
+        new_score (int): The score after the update.
+    """
+    if old_score == new_score:
+        return
+    with transaction.atomic():
+        remove_score(quiz_id, old_score)
+        add_score(quiz_id, new_score)
+
+
+def move_score_on_commit(quiz_id, old_score, new_score):
+    """
+    This function moves a participant in the score histogram once the transaction updating their score is committed.
+
+    The score is already committed when the histogram is updated, a failing move is logged rather than failing the
+    request, and the histogram is corrected by the next rebuild.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        old_score (int): The score before the update.
+        new_score (int): The score after the update.
+    """
+    if old_score != new_score:
+        transaction.on_commit(partial(move_score, quiz_id, old_score, new_score), robust=True)
+
+
+def rebuild_score_histogram(quiz_id):
+    """
+    This function recomputes the score histogram of a quiz from the scores of its participants.
+
+    The moves of answers committed while the histogram is rebuilt may still be applied after it, on a quiz that is
+    answered during the rebuild the histogram can be off by these answers until it is rebuilt again.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        int: The number of buckets of the histogram.
+    """
+    scores = (
+        UserQuizProgress.objects.filter(quiz_id=quiz_id).values("score").annotate(participants=Count("id")).order_by()
+    )
+    buckets = [QuizScoreBucket(quiz_id=quiz_id, score=row["score"], participants=row["participants"]) for row in scores]
+    with transaction.atomic():
+        QuizScoreBucket.objects.filter(quiz_id=quiz_id).delete()
+        QuizScoreBucket.objects.bulk_create(buckets)
+    return len(buckets)
+
+
+def get_score_rank(quiz, score):
+    """
+    This function places a score in the score histogram of a quiz.
+
+    The rank is the number of participants with a higher score plus one, so participants with the same score share a
+    rank. The percentile is the share of participants with a lower score, counting those with the same score half.
+
+    Args:
+        quiz (Quiz): The quiz.
+        score (int): The score to place.
+
+    Returns:
+        dict: The score, its rank and percentile, and the number of participants of the quiz.
+    """
+    buckets = (
+        QuizScoreBucket.objects.filter(quiz=quiz, participants__gt=0)
+        .order_by("score")
+        .values_list("score", "participants")
+    )
+    scores, counts = (list(column) for column in zip(*buckets)) if buckets else ([], [])
+    cumulative = list(accumulate(counts))
+    participants = cumulative[-1] if cumulative else 0
+
+    lower = bisect_left(scores, score)
+    not_higher = bisect_right(scores, score)
+    below = cumulative[lower - 1] if lower else 0
+    at_or_below = cumulative[not_higher - 1] if not_higher else 0
+
+    percentile = (below + (at_or_below - below) / 2) / participants * 100 if participants else 0.0
+    return {
+        "score": score,
+        "rank": participants - at_or_below + 1,
+        "participants": participants,
+        "percentile": round(percentile, 2),
+    }
@@ -0,0 +1,200 @@
+"""
+This module contains the background jobs of the quiz app.
+
+Jobs are rows of the ``Job`` table, which is the only queue: a worker claims the oldest pending job with a conditional
+UPDATE, so two workers never run the same job, and no broker is needed. The ``run_jobs`` management command runs the
+claimed jobs in a process pool. Jobs about a quiz reference it, the others, like the import of an uploaded file of
+users, keep their arguments in the payload of the job.
+"""
+
+from datetime import timedelta
+from uuid import uuid4
+import traceback
+import codecs
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import analyse_quiz
+
+from .grading import grade_quiz
+from .grading import save_grades
+
+from .scoring import rebuild_quiz_counters
+
+from .provisioning import IMPORT_FORMATS
+from .provisioning import import_users
+
+from .models import UserQuizProgress
+from .models import Job
+
+
+def recompute_scores(quiz):
+    with transaction.atomic():
+        # answers recorded meanwhile wait for the rebuild, instead of being overwritten by it
+        list(UserQuizProgress.objects.select_for_update().filter(quiz=quiz).values_list("id", flat=True))
+        rebuilt = rebuild_quiz_counters(quiz)
+    return {"participants": rebuilt}
+
+
+def regrade_quiz(quiz):
+    # the grades are read outside the transaction, answers recorded meanwhile would be overwritten when they are saved
+    if quiz.status.name != "Closed":
+        raise ValueError("Only closed quizzes can be regraded.")
+    grades = grade_quiz(quiz)
+    with transaction.atomic():
+        saved = save_grades(grades)
+    return {"participants": saved, "questions": grades.question_statistics()}
+
+
+def item_analysis(quiz):
+    return analyse_quiz(quiz)
+
+
+def import_user_file(path, file_format):
+    try:
+        with default_storage.open(path, "rb") as upload:
+            return import_users(
+                IMPORT_FORMATS[file_format](codecs.iterdecode(upload, "utf-8-sig")),
+                batch_size=getattr(settings, "QUIZ_IMPORT_USERS_BATCH_SIZE", 1000),
+            )
+    finally:
+        # the file holds the passwords of the users, it is not kept once they are imported
+        default_storage.delete(path)
+
+
+JOB_KINDS = {
+    "recompute_scores": recompute_scores,
+    "regrade_quiz": regrade_quiz,
+    "item_analysis": item_analysis,
+}
+
+# Jobs run with the arguments in their payload instead of a quiz
+PAYLOAD_JOB_KINDS = {
+    "import_users": import_user_file,
+}
+
+
+def enqueue_job(kind, quiz, user):
+    """
+    This function queues a job for a quiz.
+
+    Args:
+        kind (str): The kind of the job, one of ``JOB_KINDS``.
+        quiz (Quiz): The quiz to run the job for.
+        user (User): The user queueing the job.
+
+    Returns:
+        Job: The queued job.
+
+    Raises:
+        ValueError: If the kind of job does not exist.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Job kind must be one of {sorted(JOB_KINDS)}.")
+    return Job.objects.create(kind=kind, quiz=quiz, created_by=user)
+
+
+def enqueue_user_import(upload, file_format, user):
+    """
+    This function stores an uploaded file of users and queues their import.
+
+    Args:
+        upload (File): The CSV or JSONL file of users.
+        file_format (str): The format of the file, one of ``IMPORT_FORMATS``.
+        user (User): The user queueing the import.
+
+    Returns:
+        Job: The queued job.
+    """
+    path = default_storage.save(f"imports/{uuid4().hex}.{file_format}", upload)
+    return Job.objects.create(kind="import_users", payload={"path": path, "file_format": file_format}, created_by=user)
+
+
+def claim_job():
+    """
+    This function claims the oldest pending job for the calling worker.
+
+    Returns:
+        int: The ID of the claimed job, or None if no job is pending.
+    """
+    while True:
+        pending = Job.objects.filter(status=Job.PENDING).order_by("created_at", "id")
+        job_id = pending.values_list("id", flat=True).first()
+        if job_id is None:
+            return None
+        # Only one worker can move the job out of the pending status
+        claimed = Job.objects.filter(id=job_id, status=Job.PENDING).update(
+            status=Job.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return job_id
+
+
+def execute_job(job_id):
+    """
+    This function runs a claimed job and stores its result or error.
+
+    Args:
+        job_id (int): The ID of the claimed job.
+
+    Returns:
+        str: The final status of the job.
+    """
+    job = Job.objects.select_related("quiz__status").get(id=job_id)
+    try:
+        if job.kind in PAYLOAD_JOB_KINDS:
+            job.result = PAYLOAD_JOB_KINDS[job.kind](**job.payload)
+        else:
+            job.result = JOB_KINDS[job.kind](job.quiz)
+        job.status = Job.SUCCEEDED
+    except Exception:
+        job.error = traceback.format_exc()
+        job.status = Job.FAILED
+    job.finished_at = timezone.now()
+    job.save(update_fields=["result", "error", "status", "finished_at"])
+    return job.status
+
+
+def fail_job(job_id, error):
+    """
+    This function marks a running job as failed, when it could not record its outcome itself.
+
+    Args:
+        job_id (int): The ID of the job.
+        error (str): The reason of the failure.
+
+    Returns:
+        int: The number of failed jobs, 0 if the job was not running anymore.
+    """
+    return Job.objects.filter(id=job_id, status=Job.RUNNING).update(
+        status=Job.FAILED, error=error, finished_at=timezone.now()
+    )
+
+
+def release_job(job_id):
+    """
+    This function puts a claimed job back in the queue, when it could not be started.
+
+    Args:
+        job_id (int): The ID of the job.
+    """
+    Job.objects.filter(id=job_id, status=Job.RUNNING).update(status=Job.PENDING, started_at=None)
+
+
+def reclaim_stale_jobs(timeout):
+    """
+    This function puts the jobs that have been running for too long back in the queue.
+
+    They were claimed by a worker that died before finishing them.
+
+    Args:
+        timeout (float): The number of seconds after which a running job is stale.
+
+    Returns:
+        int: The number of reclaimed jobs.
+    """
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=timeout))
+    return stale.update(status=Job.PENDING, started_at=None)
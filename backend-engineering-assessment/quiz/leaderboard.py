@@ -0,0 +1,144 @@
+"""
+This module contains the keyset pagination of quiz leaderboards.
+
+The leaderboard is ordered by score, then by completion time (participants who did not complete the quiz come last),
+then by progress ID. Participants with the same score share a rank, one more than the number of participants with a
+higher score, like the rank of ``quiz.histogram.get_score_rank``. Instead of an OFFSET, every page ends with a cursor
+holding the sort key, the rank and the row number of its last row, and the next page continues right after that key.
+Fetching any page therefore costs one indexed range query.
+"""
+
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+import json
+
+from django.utils.dateparse import parse_datetime
+from django.db.models import F
+from django.db.models import Q
+
+from .models import UserQuizProgress
+
+
+def encode_cursor(row, rank, row_number):
+    """
+    This function encodes the position after a leaderboard row into an opaque cursor.
+
+    Args:
+        row (dict): The last row of a page.
+        rank (int): The rank of that row.
+        row_number (int): The number of that row in the leaderboard, starting at 1.
+
+    Returns:
+        str: The cursor.
+    """
+    completed_at = row["completed_at"].isoformat() if row["completed_at"] else None
+    position = {
+        "score": row["score"],
+        "completed_at": completed_at,
+        "id": row["id"],
+        "rank": rank,
+        "row_number": row_number,
+    }
+    return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    This function decodes a cursor created by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        dict: The score, completion time, progress ID, rank and row number of the last row of the previous page.
+
+    Raises:
+        ValueError: If the cursor is not valid.
+    """
+    try:
+        position = json.loads(urlsafe_b64decode(cursor.encode()))
+        position = {
+            "score": int(position["score"]),
+            "completed_at": parse_datetime(position["completed_at"]) if position["completed_at"] else None,
+            "id": int(position["id"]),
+            "rank": int(position["rank"]),
+            "row_number": int(position["row_number"]),
+        }
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+    return position
+
+
+def after_position(position):
+    """
+    This function builds the filter selecting the leaderboard rows that come after a position.
+
+    Args:
+        position (dict): The decoded cursor.
+
+    Returns:
+        Q: The filter.
+    """
+    if position["completed_at"] is None:
+        same_score = Q(completed_at__isnull=True, id__gt=position["id"])
+    else:
+        same_score = (
+            Q(completed_at__gt=position["completed_at"])
+            | Q(completed_at=position["completed_at"], id__gt=position["id"])
+            | Q(completed_at__isnull=True)
+        )
+    return Q(score__lt=position["score"]) | (Q(score=position["score"]) & same_score)
+
+
+def get_leaderboard_page(quiz, cursor=None, page_size=50):
+    """
+    This function returns one page of the leaderboard of a quiz.
+
+    The ranks are absolute: the first row of the leaderboard has rank 1, whatever page it is on, and tied participants
+    share the rank of the first of them, even across pages. They are carried over from page to page by the cursor, so
+    they are not recounted.
+
+    Args:
+        quiz (Quiz): The quiz.
+        cursor (str, optional): The cursor returned with the previous page.
+        page_size (int): The number of rows per page.
+
+    Returns:
+        dict: The rows of the page and the cursor of the next page, if there is one.
+
+    Raises:
+        ValueError: If the cursor is not valid.
+    """
+    user_progresses = UserQuizProgress.objects.filter(quiz=quiz)
+    rank, row_number, previous_score = 0, 0, None
+    if cursor:
+        position = decode_cursor(cursor)
+        user_progresses = user_progresses.filter(after_position(position))
+        rank, row_number, previous_score = position["rank"], position["row_number"], position["score"]
+
+    rows = list(
+        user_progresses.order_by(F("score").desc(), F("completed_at").asc(nulls_last=True), "id").values(
+            "id", "user__username", "score", "questions_answered", "completed", "completed_at"
+        )[: page_size + 1]
+    )
+
+    results = []
+    for row in rows[:page_size]:
+        row_number += 1
+        if row["score"] != previous_score:
+            # the completion time orders tied participants, but does not rank them
+            rank = row_number
+        previous_score = row["score"]
+        results.append(
+            {
+                "rank": rank,
+                "user": row["user__username"],
+                "correct_answers": row["score"],
+                "questions_answered": row["questions_answered"],
+                "completed": row["completed"],
+                "completed_at": row["completed_at"],
+            }
+        )
+
+    next_cursor = encode_cursor(rows[page_size - 1], rank, row_number) if len(rows) > page_size else None
+    return {"results": results, "next_cursor": next_cursor}
@@ -0,0 +1,357 @@
+"""
+This module contains the live scoreboards of quizzes.
+
+Whenever answers change the score counters of a participant, the new score summary of the participant is published on
+the channel of the quiz once the transaction commits. The ``stream_quiz_scores`` view forwards the events of the
+channel as Server-Sent Events, so a live scoreboard receives all scores once and is then kept up to date by one small
+event per answer, instead of polling ``get_quiz_scores``.
+
+The events are fanned out by a broker, chosen with the ``QUIZ_LIVE_BROKER`` setting. ``LocalBroker`` delivers them
+within one process, which is enough for a single ASGI worker. ``CacheBroker`` relays them through the Django cache, so
+the scoreboards served by every worker sharing the cache see the answers recorded by all of them. Any class with the
+same ``publish``, ``subscribe`` and ``has_subscribers`` methods can be plugged in.
+"""
+
+from collections import defaultdict
+from collections import deque
+from functools import lru_cache
+from functools import partial
+from threading import Lock
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .scoring import stored_progress_score
+from .scoring import stored_quiz_scores
+
+from .models import UserQuizProgress
+
+
+# Returned by a subscription that missed events, the scoreboard has to be sent again in full
+RESET = object()
+
+
+class LocalSubscription:
+    """
+    This class is the queue of events of one subscriber of a ``LocalBroker``.
+
+    Events are put from any thread and read from the event loop of the subscriber. A subscriber that falls more than
+    ``maxsize`` events behind loses them and reads ``RESET`` instead.
+    """
+
+    def __init__(self, broker, channel, maxsize=1000):
+        self.broker = broker
+        self.channel = channel
+        self.maxsize = maxsize
+        self._events = deque()
+        self._overflowed = False
+        self._lock = Lock()
+        self._loop = None
+        self._ready = None
+
+    def put(self, event):
+        with self._lock:
+            if len(self._events) >= self.maxsize:
+                self._events.clear()
+                self._overflowed = True
+            else:
+                self._events.append(event)
+            loop, ready = self._loop, self._ready
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # the event loop of the subscriber is closed, it will not read anymore
+                pass
+
+    def pop(self):
+        with self._lock:
+            if self._overflowed:
+                self._overflowed = False
+                return RESET
+            return self._events.popleft() if self._events else None
+
+    async def get(self, timeout):
+        """
+        This function waits for the next event of the subscription.
+
+        Args:
+            timeout (float): The number of seconds to wait.
+
+        Returns:
+            The event, ``RESET`` if events were lost, or None if no event was published in time.
+        """
+        if self._loop is None:
+            with self._lock:
+                self._loop = asyncio.get_running_loop()
+                self._ready = asyncio.Event()
+        event = self.pop()
+        if event is not None:
+            return event
+        self._ready.clear()
+        event = self.pop()
+        if event is not None:
+            return event
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.pop()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    This class fans out events to the subscribers of a channel within one process.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._subscriptions = defaultdict(set)
+        self._lock = Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, channel):
+        subscription = LocalSubscription(self, channel, maxsize=self.maxsize)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return bool(self._subscriptions.get(channel))
+
+
+class CacheSubscription:
+    """
+    This class reads the events of one channel of a ``CacheBroker`` by polling the Django cache.
+    """
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.position = cache.get(broker.sequence_key(channel), 0)
+        self._events = deque()
+        self.broker.listen(channel)
+        self._listening_until = time.monotonic() + broker.retention / 2
+
+    async def poll(self):
+        if time.monotonic() > self._listening_until:
+            await sync_to_async(self.broker.listen)(self.channel)
+            self._listening_until = time.monotonic() + self.broker.retention / 2
+
+        sequence = await cache.aget(self.broker.sequence_key(self.channel), 0)
+        if sequence <= self.position:
+            return
+        keys = [self.broker.event_key(self.channel, n) for n in range(self.position + 1, sequence + 1)]
+        self.position = sequence
+        events = await cache.aget_many(keys)
+        if len(events) < len(keys):
+            # the events expired before they were read
+            self._events.append(RESET)
+        else:
+            self._events.extend(events[key] for key in keys)
+
+    async def get(self, timeout):
+        """
+        This function waits for the next event of the subscription.
+
+        Args:
+            timeout (float): The number of seconds to wait.
+
+        Returns:
+            The event, ``RESET`` if events were lost, or None if no event was published in time.
+        """
+        deadline = time.monotonic() + timeout
+        while not self._events:
+            await self.poll()
+            if self._events:
+                break
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(min(self.broker.poll_interval, max(deadline - time.monotonic(), 0)))
+        return self._events.popleft()
+
+    def close(self):
+        pass
+
+
+class CacheBroker:
+    """
+    This class relays events through the Django cache, to the subscribers of all processes sharing it.
+
+    Every channel has a sequence number incremented by each event, and the events are kept in the cache for
+    ``retention`` seconds. Subscribers poll the sequence number every ``poll_interval`` seconds.
+    """
+
+    def __init__(self, poll_interval=0.5, retention=60):
+        self.poll_interval = poll_interval
+        self.retention = retention
+
+    def sequence_key(self, channel):
+        return f"{channel}:sequence"
+
+    def event_key(self, channel, sequence):
+        return f"{channel}:event:{sequence}"
+
+    def listening_key(self, channel):
+        return f"{channel}:listening"
+
+    def publish(self, channel, event):
+        key = self.sequence_key(channel)
+        cache.add(key, 0, None)
+        sequence = cache.incr(key)
+        cache.set(self.event_key(channel, sequence), event, self.retention)
+
+    def subscribe(self, channel):
+        return CacheSubscription(self, channel)
+
+    def listen(self, channel):
+        cache.set(self.listening_key(channel), True, self.retention)
+
+    def has_subscribers(self, channel):
+        return cache.get(self.listening_key(channel), False)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """
+    This function returns the broker of the live scoreboards.
+
+    Returns:
+        The broker configured with ``QUIZ_LIVE_BROKER``.
+    """
+    return import_string(getattr(settings, "QUIZ_LIVE_BROKER", "quiz.live.LocalBroker"))()
+
+
+def quiz_channel(quiz_id):
+    """
+    This function returns the name of the scoreboard channel of a quiz.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+
+    Returns:
+        str: The name of the channel.
+    """
+    return f"quiz:live:{quiz_id}"
+
+
+def publish_progress_score(quiz_id, user_progress_id):
+    """
+    This function publishes the score of a participant on the scoreboard of their quiz once the transaction commits.
+
+    It has to be called in the transaction that updates the score counters of the progress. The score is only read
+    if someone is watching the scoreboard.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        user_progress_id (int): The ID of the progress of the participant.
+    """
+    transaction.on_commit(partial(send_progress_score, quiz_id, user_progress_id), robust=True)
+
+
+def send_progress_score(quiz_id, user_progress_id):
+    """
+    This function publishes the current score of a participant on the scoreboard of their quiz.
+
+    Args:
+        quiz_id (int): The ID of the quiz.
+        user_progress_id (int): The ID of the progress of the participant.
+    """
+    broker = get_broker()
+    channel = quiz_channel(quiz_id)
+    if not broker.has_subscribers(channel):
+        return
+    user_progress = UserQuizProgress.objects.select_related("user", "quiz__status").filter(id=user_progress_id).first()
+    if user_progress is None:
+        return
+    broker.publish(channel, {"user": user_progress.user.username, **stored_progress_score(user_progress)})
+
+
+def format_event(name, data):
+    """
+    This function formats a Server-Sent Event.
+
+    Args:
+        name (str): The name of the event.
+        data: The data of the event, serialized to JSON.
+
+    Returns:
+        str: The event.
+    """
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def open_scoreboard(quiz):
+    """
+    This function subscribes to the scoreboard of a quiz and reads all scores.
+
+    The subscription is made first, so no answer recorded in between is missed.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+
+    Returns:
+        tuple: The subscription and the score summaries of all participants.
+    """
+    subscription = get_broker().subscribe(quiz_channel(quiz.id))
+    try:
+        return subscription, stored_quiz_scores(quiz)
+    except Exception:
+        subscription.close()
+        raise
+
+
+async def iter_score_events(quiz, heartbeat=None):
+    """
+    This function yields the live scoreboard of a quiz as Server-Sent Events.
+
+    The first ``scores`` event holds the scores of all participants. Then every ``score`` event holds the new score
+    of one participant, replacing their previous one. A comment is sent whenever no answer was recorded for
+    ``heartbeat`` seconds, to keep the connection open, and all scores are sent again if events were lost.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+        heartbeat (float, optional): The number of seconds between keep-alive comments.
+
+    Yields:
+        str: One event or comment.
+    """
+    if heartbeat is None:
+        heartbeat = getattr(settings, "QUIZ_LIVE_HEARTBEAT", 15)
+
+    subscription, scores = await sync_to_async(open_scoreboard)(quiz)
+    try:
+        yield format_event("scores", scores)
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif event is RESET:
+                yield format_event("scores", await sync_to_async(stored_quiz_scores)(quiz))
+            else:
+                yield format_event("score", event)
+    finally:
+        subscription.close()
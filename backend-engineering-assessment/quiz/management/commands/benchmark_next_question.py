@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from ...models import AnsweredQuestion, Answer, Question, Quiz, QuizStatus, User, UserQuizProgress
+from ...progress import find_next_question
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = "Measure the next question lookup from the first to the last question of a quiz. Nothing is kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=500, help="Number of questions of the quiz.")
+        parser.add_argument("--repeat", type=int, default=20, help="Number of timed lookups per question.")
+        parser.add_argument("--report-every", type=int, default=50, help="Print one line every N questions.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user_progress = self.create_quiz(options["questions"])
+
+            self.stdout.write(f"{'question':>8} {'median ms':>10} {'queries':>8}")
+            medians = []
+            for step in range(1, options["questions"] + 1):
+                timings = []
+                for _ in range(options["repeat"]):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        question = find_next_question(user_progress)
+                        timings.append(time.perf_counter() - started)
+                medians.append(statistics.median(timings) * 1000)
+
+                if step == 1 or step % options["report_every"] == 0 or step == options["questions"]:
+                    self.stdout.write(f"{step:>8} {medians[-1]:>10.3f} {len(queries):>8}")
+
+                # answer the question, like a participant would
+                answer = question.answers.first()
+                AnsweredQuestion.objects.create(progress=user_progress, question=question, answer=answer)
+                user_progress.cursor = question.position
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Question 1: {medians[0]:.3f}ms, question {len(medians)}: {medians[-1]:.3f}ms "
+                f"({medians[-1] / medians[0]:.2f}x)"
+            )
+        )
+
+    def create_quiz(self, question_count):
+        user = User.objects.create(username=f"benchmark-{time.time_ns()}")
+        quiz_status = QuizStatus.objects.filter(name="Draft").first() or QuizStatus.objects.create(name="Draft")
+        quiz = Quiz.objects.create(title="Benchmark", created_by=user, status=quiz_status)
+
+        questions = Question.objects.bulk_create(
+            [Question(quiz=quiz, question=f"Question {n}", position=n) for n in range(1, question_count + 1)]
+        )
+        Answer.objects.bulk_create(
+            [Answer(question=question, answer="Answer", is_correct=True) for question in questions]
+        )
+        return UserQuizProgress.objects.create(user=user, quiz=quiz)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from ...buffer import flush_pending_answers
+import time
+
+
+class Command(BaseCommand):
+    help = "Record the answers buffered in write-behind mode, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=200, help="Milliseconds to wait between flushes.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Largest number of answers per flush.")
+        parser.add_argument("--once", action="store_true", help="Exit once the buffer is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_pending_answers(batch_size=options["batch_size"])
+            if flushed:
+                self.stdout.write(self.style.SUCCESS(f"Recorded {flushed} pending answers"))
+            # a full batch means more answers are waiting, flush them right away
+            if flushed == options["batch_size"]:
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["interval"] / 1000)
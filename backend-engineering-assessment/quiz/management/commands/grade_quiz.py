@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+from ...models import Quiz
+from ...grading import grade_quiz, save_grades
+import json
+import time
+
+
+class Command(BaseCommand):
+    help = "Grade all participants of a closed quiz at once, and optionally save their scores."
+
+    def add_arguments(self, parser):
+        parser.add_argument("quiz_id", type=int, help="ID of the quiz to grade.")
+        parser.add_argument("--save", action="store_true", help="Write the grades back to the score counters.")
+        parser.add_argument("--statistics", action="store_true", help="Print the per-question statistics as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.select_related("status").get(id=options["quiz_id"])
+        except Quiz.DoesNotExist:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist.")
+
+        if quiz.status.name != "Closed":
+            raise CommandError("Only closed quizzes can be graded in bulk.")
+
+        started = time.monotonic()
+        grades = grade_quiz(quiz)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Graded {len(grades.progress_ids)} participants of quiz {quiz.id} "
+                f"in {time.monotonic() - started:.2f}s"
+            )
+        )
+
+        if options["save"]:
+            with transaction.atomic():
+                saved = save_grades(grades)
+            self.stdout.write(self.style.SUCCESS(f"Saved the scores of {saved} participants"))
+
+        if options["statistics"]:
+            self.stdout.write(json.dumps(grades.question_statistics(), indent=2))
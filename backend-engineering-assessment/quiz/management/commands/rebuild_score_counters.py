@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+from ...models import Quiz
+from ...scoring import rebuild_quiz_counters, check_quiz_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the score counters of all participants of the given quizzes, or only check them with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument("quiz_ids", nargs="+", type=int, help="IDs of the quizzes to rebuild.")
+        parser.add_argument(
+            "--check", action="store_true", help="Only report inconsistent counters, without changing anything."
+        )
+
+    def handle(self, *args, **options):
+        inconsistent = 0
+        for quiz_id in options["quiz_ids"]:
+            try:
+                quiz = Quiz.objects.select_related("status").get(id=quiz_id)
+            except Quiz.DoesNotExist:
+                raise CommandError(f"Quiz {quiz_id} does not exist.")
+
+            if options["check"]:
+                inconsistent += self.check_quiz(quiz)
+            else:
+                with transaction.atomic():
+                    rebuilt = rebuild_quiz_counters(quiz)
+                self.stdout.write(
+                    self.style.SUCCESS(f"Rebuilt the counters of {rebuilt} participants of quiz {quiz_id}")
+                )
+
+        if inconsistent:
+            raise CommandError(f"Found {inconsistent} inconsistent counters.")
+
+    def check_quiz(self, quiz):
+        mismatches = check_quiz_counters(quiz)
+        for mismatch in mismatches:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Quiz {quiz.id}, progress {mismatch['progress_id']}: {mismatch['field']} is {mismatch['stored']}, "
+                    f"expected {mismatch['expected']}"
+                )
+            )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(f"The counters of quiz {quiz.id} are consistent"))
+        return len(mismatches)
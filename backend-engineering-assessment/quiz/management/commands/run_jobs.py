@@ -0,0 +1,129 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.core.management.base import BaseCommand
+from django.db import connections
+import multiprocessing
+import django
+import time
+import os
+
+
+# Workers are spawned and import this module before Django is set up, so the quiz modules are imported inside the
+# functions, once it is
+
+
+def init_worker():
+    django.setup()
+
+
+def run_job(job_id):
+    from ...jobs import execute_job
+
+    try:
+        return execute_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run the queued background jobs, using the database as the queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes, 0 to run inline."
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0, help="Seconds to wait when no job is pending."
+        )
+        parser.add_argument("--once", action="store_true", help="Exit once no job is pending anymore.")
+        parser.add_argument(
+            "--stale-after",
+            type=float,
+            default=3600.0,
+            help="Seconds after which a running job is considered abandoned and queued again on startup.",
+        )
+
+    def handle(self, *args, **options):
+        from ...jobs import reclaim_stale_jobs
+
+        reclaimed = reclaim_stale_jobs(options["stale_after"])
+        if reclaimed:
+            self.stdout.write(self.style.WARNING(f"Queued {reclaimed} abandoned jobs again"))
+
+        if options["workers"] < 1:
+            self.run_inline(options)
+        else:
+            self.run_pool(options)
+
+    def run_inline(self, options):
+        from ...jobs import claim_job, execute_job
+
+        while True:
+            job_id = claim_job()
+            if job_id is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+            self.report(job_id, execute_job(job_id))
+
+    def start_pool(self, options):
+        context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(options["workers"], mp_context=context, initializer=init_worker)
+
+    def restart_pool(self, pool, running, options):
+        from ...jobs import fail_job
+
+        # a dead worker breaks the whole pool, the jobs still running in it are lost
+        pool.shutdown(wait=False, cancel_futures=True)
+        for job_id in running.values():
+            fail_job(job_id, "The worker pool crashed.")
+            self.stdout.write(self.style.ERROR(f"Job {job_id} failed, the worker pool crashed"))
+        running.clear()
+        return self.start_pool(options)
+
+    def run_pool(self, options):
+        from ...jobs import claim_job, fail_job, release_job
+
+        running = {}
+        pool = self.start_pool(options)
+        try:
+            while True:
+                while len(running) < options["workers"]:
+                    job_id = claim_job()
+                    if job_id is None:
+                        break
+                    try:
+                        running[pool.submit(run_job, job_id)] = job_id
+                    except BrokenProcessPool:
+                        # a worker died since the last check, this job never started
+                        release_job(job_id)
+                        pool = self.restart_pool(pool, running, options)
+
+                if not running:
+                    if options["once"]:
+                        return
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                done, _ = wait(running, timeout=options["poll_interval"], return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        self.report(job_id, future.result())
+                    except Exception as e:
+                        # the job could not record its outcome itself
+                        fail_job(job_id, f"The worker crashed: {e!r}")
+                        self.stdout.write(self.style.ERROR(f"Job {job_id} crashed the worker: {e!r}"))
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                if broken:
+                    pool = self.restart_pool(pool, running, options)
+        finally:
+            pool.shutdown()
+
+    def report(self, job_id, job_status):
+        from ...models import Job
+
+        style = self.style.SUCCESS if job_status == Job.SUCCEEDED else self.style.ERROR
+        self.stdout.write(style(f"Job {job_id} {job_status}"))
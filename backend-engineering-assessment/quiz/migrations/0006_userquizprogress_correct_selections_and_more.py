@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:10
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Q
+from django.utils import timezone
+
+
+def fill_score_counters(apps, schema_editor):
+    Answer = apps.get_model("quiz", "Answer")
+    Question = apps.get_model("quiz", "Question")
+    UserQuizProgress = apps.get_model("quiz", "UserQuizProgress")
+
+    question_counts = dict(Question.objects.values("quiz_id").annotate(n=Count("id")).values_list("quiz_id", "n"))
+    wrong_answer_counts = dict(
+        Answer.objects.filter(is_correct=False)
+        .values("question__quiz_id")
+        .annotate(n=Count("id"))
+        .values_list("question__quiz_id", "n")
+    )
+
+    # same rules as the scoring engine: only answers of their question, and questions of the quiz, are selections
+    valid_selection = Q(
+        answered_questions__answer__question=F("answered_questions__question"),
+        answered_questions__question__quiz=F("quiz"),
+    )
+    user_progresses = UserQuizProgress.objects.annotate(
+        answered_count=Count("answered_questions__question", distinct=True),
+        correct_count=Count(
+            "answered_questions__answer",
+            distinct=True,
+            filter=valid_selection & Q(answered_questions__answer__is_correct=True),
+        ),
+        wrong_count=Count(
+            "answered_questions__answer",
+            distinct=True,
+            filter=valid_selection & Q(answered_questions__answer__is_correct=False),
+        ),
+    ).order_by("id")
+
+    updated = []
+    for user_progress in user_progresses:
+        user_progress.questions_answered = user_progress.answered_count
+        user_progress.correct_selections = user_progress.correct_count
+        user_progress.wrong_selections = user_progress.wrong_count
+        user_progress.score = (
+            user_progress.correct_count + wrong_answer_counts.get(user_progress.quiz_id, 0) - user_progress.wrong_count
+        )
+        completed = user_progress.answered_count == question_counts.get(user_progress.quiz_id, 0)
+        if completed and not user_progress.completed_at:
+            user_progress.completed_at = timezone.now()
+        user_progress.completed = completed
+        updated.append(user_progress)
+
+    fields = ["questions_answered", "correct_selections", "wrong_selections", "score", "completed", "completed_at"]
+    UserQuizProgress.objects.bulk_update(updated, fields, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_answeredquestion_answer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userquizprogress',
+            name='correct_selections',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userquizprogress',
+            name='questions_answered',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userquizprogress',
+            name='wrong_selections',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_score_counters, migrations.RunPython.noop),
+    ]
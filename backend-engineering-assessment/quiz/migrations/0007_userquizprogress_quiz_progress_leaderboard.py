@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_userquizprogress_correct_selections_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userquizprogress',
+            index=models.Index(fields=['quiz', '-score', 'completed_at'], name='quiz_progress_leaderboard'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_score_buckets(apps, schema_editor):
+    UserQuizProgress = apps.get_model("quiz", "UserQuizProgress")
+    QuizScoreBucket = apps.get_model("quiz", "QuizScoreBucket")
+    buckets = UserQuizProgress.objects.values("quiz_id", "score").annotate(participants=Count("id")).order_by()
+    QuizScoreBucket.objects.bulk_create(
+        [QuizScoreBucket(quiz_id=b["quiz_id"], score=b["score"], participants=b["participants"]) for b in buckets],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField()),
+                ('participants', models.IntegerField(default=0)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='quiz.quiz')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('quiz', 'score'), name='quiz_score_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(fill_score_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:30
+
+from django.db import migrations, models
+from django.db.models import OuterRef
+from django.db.models import Subquery
+
+
+def fill_positions(apps, schema_editor):
+    Question = apps.get_model("quiz", "Question")
+    UserQuizProgress = apps.get_model("quiz", "UserQuizProgress")
+
+    questions = []
+    positions = {}
+    for question in Question.objects.order_by("quiz_id", "created_at", "id").only("id", "quiz_id"):
+        positions[question.quiz_id] = positions.get(question.quiz_id, 0) + 1
+        question.position = positions[question.quiz_id]
+        questions.append(question)
+    Question.objects.bulk_update(questions, ["position"], batch_size=1000)
+
+    last_position = Question.objects.filter(id=OuterRef("last_answered_question_id")).values("position")
+    UserQuizProgress.objects.filter(last_answered_question__isnull=False).update(cursor=Subquery(last_position))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_quizscorebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userquizprogress',
+            name='cursor',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_positions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='question',
+            constraint=models.UniqueConstraint(fields=('quiz', 'position'), name='quiz_question_position_unique'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:34
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models import Min
+
+
+def remove_duplicate_answers(apps, schema_editor):
+    AnsweredQuestion = apps.get_model("quiz", "AnsweredQuestion")
+    duplicates = (
+        AnsweredQuestion.objects.values("progress_id", "question_id", "answer_id")
+        .annotate(first_id=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        # the first submission is kept, its answered_at is when the answer was given
+        AnsweredQuestion.objects.filter(
+            progress_id=duplicate["progress_id"],
+            question_id=duplicate["question_id"],
+            answer_id=duplicate["answer_id"],
+        ).exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_question_position_userquizprogress_cursor_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='answeredquestion',
+            constraint=models.UniqueConstraint(fields=('progress', 'question', 'answer'), name='quiz_answered_question_unique'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_answeredquestion_quiz_answered_question_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True)),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.answer')),
+                ('progress', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_answers', to='quiz.userquizprogress')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.question')),
+            ],
+        ),
+    ]
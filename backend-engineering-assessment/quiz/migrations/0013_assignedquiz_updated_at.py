@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_pendinganswer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignedquiz',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
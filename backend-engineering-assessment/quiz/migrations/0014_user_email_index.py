@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Supports the prefix search of users by email, the username already has the index of its unique constraint
+EMAIL_INDEX = models.Index(fields=["email"], name="quiz_user_email_prefix", opclasses=["varchar_pattern_ops"])
+
+
+def add_email_index(apps, schema_editor):
+    # the operator class lets PostgreSQL use the index for LIKE prefixes, other databases ignore it
+    schema_editor.add_index(apps.get_model(settings.AUTH_USER_MODEL), EMAIL_INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model(settings.AUTH_USER_MODEL), EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0013_assignedquiz_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0014_user_email_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
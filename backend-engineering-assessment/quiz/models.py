@@ -69,11 +69,23 @@ class Question(models.Model):
 
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="questions")
     question = models.TextField()
+    # 1-based position of the question in its quiz, assigned in creation order
+    position = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["created_at"]  # Ensures questions are fetched in creation order
+        constraints = [
+            # Also the index of the next question lookup
+            models.UniqueConstraint(fields=["quiz", "position"], name="quiz_question_position_unique"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.position:
+            last_position = Question.objects.filter(quiz_id=self.quiz_id).aggregate(models.Max("position"))
+            self.position = (last_position["position__max"] or 0) + 1
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.question
@@ -102,6 +114,7 @@ class AssignedQuiz(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="assigned_quizzes")
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="assigned_users")
     accepted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.quiz.title} - {self.user.username}"
@@ -117,15 +130,46 @@ class UserQuizProgress(models.Model):
     last_answered_question = models.ForeignKey(
         Question, on_delete=models.SET_NULL, null=True, blank=True, related_name="last_answered_progress"
     )
+    # Position of the last answered question, the next question is looked up after it. Set with
+    # last_answered_question by quiz.answers when an answer is recorded
+    cursor = models.PositiveIntegerField(default=0)
     score = models.IntegerField(default=0)
+    # Denormalized counters, maintained by quiz.scoring.increment_counters when answers are recorded
+    questions_answered = models.IntegerField(default=0)
+    correct_selections = models.IntegerField(default=0)
+    wrong_selections = models.IntegerField(default=0)
     completed = models.BooleanField(default=False)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Supports the keyset pagination of the leaderboard
+            models.Index(fields=["quiz", "-score", "completed_at"], name="quiz_progress_leaderboard"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title} - Progress"
 
 
+class QuizScoreBucket(models.Model):
+    """
+    This model represents the number of participants of a quiz with a given score, maintained by quiz.histogram.
+    """
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="score_buckets")
+    score = models.IntegerField()
+    participants = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["quiz", "score"], name="quiz_score_bucket_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz.title} - {self.score} - {self.participants}"
+
+
 class AnsweredQuestion(models.Model):
     """
     This model represents a question that has been answered by a user.
@@ -137,5 +181,63 @@ class AnsweredQuestion(models.Model):
     answered_correctly = models.BooleanField(default=False)
     answered_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # An answer is recorded once per progress, however often it is submitted
+            models.UniqueConstraint(fields=["progress", "question", "answer"], name="quiz_answered_question_unique"),
+        ]
+
     def __str__(self):
         return f"{self.progress.user.username} - {self.question.question} - {'Correct' if self.answered_correctly else 'Incorrect'}"
+
+
+class PendingAnswer(models.Model):
+    """
+    This model represents a submitted answer that is not recorded as an answered question yet, see quiz.buffer.
+    """
+
+    progress = models.ForeignKey(UserQuizProgress, on_delete=models.CASCADE, related_name="pending_answers")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.progress_id} - {self.question_id} - {self.answer_id} - Pending"
+
+
+class Job(models.Model):
+    """
+    This model represents a background job, queued in the database and run by the run_jobs command.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=100)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs")
+    # The arguments of the jobs that are not about a quiz
+    payload = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="jobs")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Supports claiming the oldest pending job
+            models.Index(fields=["status", "created_at"], name="quiz_job_queue"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} - {self.quiz_id} - {self.status}"
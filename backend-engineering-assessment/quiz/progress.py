@@ -0,0 +1,38 @@
+"""
+This module contains the navigation of participants through a quiz.
+
+Questions carry their position in the quiz and progresses carry a cursor, the position of the last answered question.
+The next question is the first question after the cursor that has not been answered yet, found with one query on the
+``(quiz, position)`` index, however many questions the participant has answered. Answers still pending in the
+write-behind buffer count as answered.
+"""
+
+from django.db.models import OuterRef
+from django.db.models import Exists
+
+from .buffer import write_behind_enabled
+
+from .models import AnsweredQuestion
+from .models import PendingAnswer
+from .models import Question
+
+
+def find_next_question(user_progress):
+    """
+    This function finds the next question a participant has to answer.
+
+    Args:
+        user_progress (UserQuizProgress): The progress of the participant.
+
+    Returns:
+        Question: The next question, or None if there is no unanswered question after the cursor.
+    """
+    answered = AnsweredQuestion.objects.filter(progress_id=user_progress.id, question=OuterRef("pk"))
+    questions = Question.objects.filter(quiz_id=user_progress.quiz_id, position__gt=user_progress.cursor).exclude(
+        Exists(answered)
+    )
+    if write_behind_enabled():
+        # answers still in the buffer do not move the cursor, but their questions are answered all the same
+        pending = PendingAnswer.objects.filter(progress_id=user_progress.id, question=OuterRef("pk"))
+        questions = questions.exclude(Exists(pending))
+    return questions.order_by("position").first()
@@ -0,0 +1,222 @@
+"""
+This module contains the bulk provisioning of users.
+
+A CSV or JSONL file with one user per row (``username``, ``password``, ``email`` and ``role``) is read as a stream and
+imported in batches. Every batch is validated with one query for the usernames already taken, its passwords are hashed
+in a process pool, since hashing is by far the most expensive step, and its users and profiles are inserted with two
+bulk inserts in one transaction. Rows without a password get an unusable password, for users who set theirs through a
+password reset, and cost no hashing at all. Invalid rows are reported and skipped, they do not fail the import. A file
+that is not UTF-8 encoded stops the import at the batch where it is found, the earlier batches are kept and reported.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+import multiprocessing
+import json
+import csv
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError
+from django.db import transaction
+
+from .roles import invalidate_user_role
+
+from .models import UserProfile
+from .models import User
+from .models import Role
+
+
+# Below this number of passwords per batch, starting the worker processes costs more than it saves
+POOL_THRESHOLD = 64
+
+
+def iter_csv_rows(lines):
+    """
+    This function reads users from CSV lines with a header.
+
+    Args:
+        lines (iterable): The lines of the file, as text.
+
+    Yields:
+        dict: One user.
+    """
+    yield from csv.DictReader(lines)
+
+
+def iter_jsonl_rows(lines):
+    """
+    This function reads users from JSON lines.
+
+    Args:
+        lines (iterable): The lines of the file, as text.
+
+    Yields:
+        dict: One user, with text values like a CSV row, or None for a line that is not a JSON object.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            yield None
+            continue
+        yield {key: None if value is None else str(value) for key, value in row.items()}
+
+
+IMPORT_FORMATS = {
+    "csv": iter_csv_rows,
+    "jsonl": iter_jsonl_rows,
+    "ndjson": iter_jsonl_rows,
+}
+
+
+def validate_user_row(row, roles, taken):
+    """
+    This function validates one user of an import.
+
+    Args:
+        row (dict): The user, or None if the row could not be parsed.
+        roles (dict): The roles, by name.
+        taken (set): The usernames already in use, including those earlier in the import.
+
+    Returns:
+        str: The reason the user cannot be imported, or None if the user is valid.
+    """
+    if row is None:
+        return "Row is not a valid user."
+    username = (row.get("username") or "").strip()
+    if not username:
+        return "Username is required."
+    try:
+        User.username_validator(username)
+    except ValidationError:
+        return "Username is not valid."
+    if len(username) > User._meta.get_field("username").max_length:
+        return "Username is too long."
+    if username in taken:
+        return "Username already exists."
+    if row.get("email"):
+        try:
+            validate_email(row["email"])
+        except ValidationError:
+            return "Email is not valid."
+    if row.get("role") not in roles:
+        return "Role does not exist."
+    return None
+
+
+def hash_passwords(passwords, pool=None):
+    """
+    This function hashes passwords, in the process pool if there are enough of them.
+
+    Args:
+        passwords (list): The raw passwords, None for an unusable password.
+        pool (ProcessPoolExecutor, optional): The worker processes.
+
+    Returns:
+        list: The password hashes.
+    """
+    if pool is None or sum(password is not None for password in passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=16))
+
+
+def import_user_batch(rows, first_row, roles, pool=None):
+    """
+    This function imports one batch of users.
+
+    Args:
+        rows (list): The users of the batch.
+        first_row (int): The number of the first user of the batch in the file, starting at 1.
+        roles (dict): The roles, by name.
+        pool (ProcessPoolExecutor, optional): The worker processes hashing the passwords.
+
+    Returns:
+        tuple: The number of imported users and the rejected rows.
+    """
+    usernames = [(row.get("username") or "").strip() for row in rows if row]
+    taken = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+
+    valid, rejected = [], []
+    for number, row in enumerate(rows, start=first_row):
+        error = validate_user_row(row, roles, taken)
+        if error:
+            rejected.append({"row": number, "username": row.get("username") if row else None, "error": error})
+            continue
+        taken.add(row["username"].strip())
+        valid.append((number, row))
+
+    if not valid:
+        return 0, rejected
+
+    hashes = hash_passwords([row.get("password") or None for _, row in valid], pool)
+    users = [
+        User(username=row["username"].strip(), email=row.get("email") or "", password=password_hash)
+        for (_, row), password_hash in zip(valid, hashes)
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            if any(user.pk is None for user in users):
+                # not every database returns the primary keys of bulk inserts
+                ids = User.objects.filter(username__in=[user.username for user in users]).values_list("username", "id")
+                ids = dict(ids)
+                for user in users:
+                    user.pk = ids[user.username]
+            UserProfile.objects.bulk_create(
+                [UserProfile(user=user, role=roles[row["role"]]) for (_, row), user in zip(valid, users)]
+            )
+    except IntegrityError:
+        # a username was taken by a concurrent import, the whole batch is rolled back
+        rejected.extend(
+            {"row": number, "username": user.username, "error": "Username already exists."}
+            for (number, _), user in zip(valid, users)
+        )
+        return 0, sorted(rejected, key=lambda item: item["row"])
+
+    # bulk inserts send no signals, the new users must not inherit the cached role of a deleted user with their ID
+    for user in users:
+        invalidate_user_role(user.pk)
+    return len(users), rejected
+
+
+def import_users(rows, workers=0, batch_size=1000):
+    """
+    This function imports users in batches.
+
+    Args:
+        rows (iterable): The users, as read by one of the ``IMPORT_FORMATS``.
+        workers (int): The number of processes hashing passwords, 0 to hash them in this process.
+        batch_size (int): The number of users per transaction.
+
+    Returns:
+        dict: The number of imported users and the rejected rows, with their number and the reason. If the file turns
+            out not to be UTF-8 encoded, the batches before are kept and the error is returned with them.
+    """
+    roles = {role.name: role for role in Role.objects.all()}
+    rows = iter(rows)
+    created, rejected = 0, []
+
+    # the workers only hash passwords, they are set up like the other processes of the app
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(workers, mp_context=context, initializer=django.setup) if workers else nullcontext()
+    with pool:
+        first_row = 1
+        try:
+            while batch := list(islice(rows, batch_size)):
+                batch_created, batch_rejected = import_user_batch(batch, first_row, roles, pool if workers else None)
+                created += batch_created
+                rejected.extend(batch_rejected)
+                first_row += len(batch)
+        except UnicodeDecodeError:
+            # the file is decoded as it is read, the earlier batches are already committed
+            error = f"File must be UTF-8 encoded, the rows from {first_row} on were not imported."
+            return {"created": created, "rejected": rejected, "error": error}
+    return {"created": created, "rejected": rejected}
@@ -0,0 +1,186 @@
+"""
+This module contains the resolution of user roles and their capabilities.
+
+Role checks run on every creator endpoint. The role of a user is read with one query joining their profile to their
+role, cached in process for ``QUIZ_ROLE_CACHE_TIMEOUT`` seconds and memoized on the request, so a role check normally
+costs no query at all. Saving or deleting a profile or a role invalidates the cached roles of this process through
+signals, the other processes see the change once their entry times out.
+
+Every role is compiled into a bitmask of ``Capability`` flags: the capabilities granted to it in
+``QUIZ_ROLE_CAPABILITIES``, and those of every role below it, with a greater ``level``. All roles are compiled with one
+query and cached like the roles of the users, so checking a capability is a bit test. A new tier only needs a role with
+the right level, and the capabilities it adds in the settings.
+"""
+
+from enum import IntFlag
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .cache import LocalCache
+
+from .models import UserProfile
+from .models import Role
+
+
+# Cached for users without a profile, who are refused by every role check
+NO_PROFILE = object()
+
+MISSING = object()
+
+
+role_cache = LocalCache(
+    maxsize=getattr(settings, "QUIZ_ROLE_CACHE_SIZE", 4096),
+    ttl=getattr(settings, "QUIZ_ROLE_CACHE_TIMEOUT", 60),
+)
+
+role_masks = LocalCache(maxsize=1, ttl=getattr(settings, "QUIZ_ROLE_CACHE_TIMEOUT", 60))
+role_masks_lock = Lock()
+
+
+class Capability(IntFlag):
+    """
+    This class enumerates the capabilities a role can grant.
+    """
+
+    CREATE_QUIZ = 1
+    EDIT_QUIZ = 2
+    ASSIGN_QUIZ = 4
+    VIEW_SCORES = 8
+    RUN_JOBS = 16
+    VIEW_USERS = 32
+    VIEW_STATS = 64
+    CREATE_USERS = 128
+
+    @classmethod
+    def parse(cls, names):
+        """
+        This function combines capabilities given by name.
+
+        Args:
+            names (list): The names of the capabilities, in lower case.
+
+        Returns:
+            Capability: The combined capabilities.
+        """
+        mask = cls(0)
+        for name in names:
+            try:
+                mask |= cls[name.upper()]
+            except KeyError:
+                raise ImproperlyConfigured(f"Unknown capability in QUIZ_ROLE_CAPABILITIES: {name}")
+        return mask
+
+
+def get_user_role(user_id):
+    """
+    This function returns the name of the role of a user, reading it from the cache if possible.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        str: The name of the role, None if the user has no role, or ``NO_PROFILE`` if the user has no profile.
+    """
+    role = role_cache.get(user_id, MISSING)
+    if role is MISSING:
+        roles = list(UserProfile.objects.filter(user_id=user_id).values_list("role__name", flat=True)[:1])
+        role = roles[0] if roles else NO_PROFILE
+        role_cache.set(user_id, role)
+    return role
+
+
+def get_request_role(request):
+    """
+    This function returns the name of the role of the user of a request, resolving it once per request.
+
+    Args:
+        request (Request): The request of an authenticated user.
+
+    Returns:
+        str: The name of the role, None if the user has no role, or ``NO_PROFILE`` if the user has no profile.
+    """
+    role = getattr(request, "user_role", MISSING)
+    if role is MISSING:
+        role = request.user_role = get_user_role(request.user.id)
+    return role
+
+
+def invalidate_user_role(user_id):
+    """
+    This function removes the cached role of a user.
+
+    Args:
+        user_id (int): The ID of the user.
+    """
+    role_cache.delete(user_id)
+
+
+def invalidate_roles():
+    """
+    This function removes the cached roles of all users and the compiled capabilities, when a role itself changes.
+    """
+    role_cache.clear()
+    role_masks.clear()
+
+
+def compile_role_masks():
+    """
+    This function compiles the capabilities of all roles into bitmasks.
+
+    A role has the capabilities granted to it and those of every role with a greater level.
+
+    Returns:
+        dict: The capabilities of every role, by role name.
+    """
+    granted = getattr(settings, "QUIZ_ROLE_CAPABILITIES", {})
+    roles = []
+    for name, level in Role.objects.values_list("name", "level"):
+        roles.append((name, level, Capability.parse(granted.get(name, []))))
+
+    masks = {}
+    for name, level, _ in roles:
+        mask = Capability(0)
+        for other_name, other_level, other_mask in roles:
+            if other_name == name or other_level > level:
+                mask |= other_mask
+        masks[name] = masks.get(name, Capability(0)) | mask
+    return masks
+
+
+def get_role_capabilities(role):
+    """
+    This function returns the capabilities of a role, compiling the capabilities of all roles if they are not cached.
+
+    Args:
+        role (str): The name of the role.
+
+    Returns:
+        Capability: The capabilities of the role.
+    """
+    masks = role_masks.get("masks")
+    if masks is None:
+        with role_masks_lock:
+            masks = role_masks.get("masks")
+            if masks is None:
+                masks = compile_role_masks()
+                role_masks.set("masks", masks)
+    return masks.get(role, Capability(0))
+
+
+def get_request_capabilities(request):
+    """
+    This function returns the capabilities of the user of a request, resolving them once per request.
+
+    Args:
+        request (Request): The request of an authenticated user.
+
+    Returns:
+        Capability: The capabilities of the user, or ``NO_PROFILE`` if the user has no profile.
+    """
+    capabilities = getattr(request, "capabilities", MISSING)
+    if capabilities is MISSING:
+        role = get_request_role(request)
+        capabilities = request.capabilities = role if role is NO_PROFILE else get_role_capabilities(role)
+    return capabilities
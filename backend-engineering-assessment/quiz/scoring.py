@@ -0,0 +1,292 @@
+"""
+This module contains the scoring engine for the quiz app.
+
+The scores are computed with a fixed number of aggregate queries instead of walking every question and answer of a
+quiz. The rules are the same as in the original per-answer loop:
+
+- every answer of the quiz counts towards ``total_answers``;
+- a selected correct answer and an unselected wrong answer both count as a correct answer;
+- a question counts as answered as soon as at least one answer has been recorded for it.
+
+Computing the scores from the answered questions is the reference, used to rebuild and check the denormalized counters
+on ``UserQuizProgress``. The API endpoints read the counters, which are kept up to date by ``increment_counters``.
+"""
+
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.db.models import Count
+from django.db.models import Case
+from django.db.models import When
+from django.db.models import F
+from django.db.models import Q
+
+from .answer_key import get_answer_key
+
+from .histogram import rebuild_score_histogram
+from .histogram import move_score_on_commit
+
+from .models import UserQuizProgress
+
+
+def get_quiz_totals(quiz):
+    """
+    This function returns the answer key totals of a quiz.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+
+    Returns:
+        dict: The number of questions, answers and wrong answers of the quiz.
+    """
+    return get_answer_key(quiz).totals
+
+
+def annotate_selections(user_progresses):
+    """
+    This function annotates progresses with their number of answered questions and selected answers.
+
+    All progresses are counted in one grouped query over their answered questions joined to the answers. Only answers
+    that belong to the question they were recorded for, and questions that belong to the quiz of the progress, are
+    taken into account.
+
+    Args:
+        user_progresses (QuerySet): The progresses to annotate.
+
+    Returns:
+        QuerySet: The progresses annotated with ``answered_count``, ``correct_count`` and ``wrong_count``.
+    """
+    valid_selection = Q(
+        answered_questions__answer__question=F("answered_questions__question"),
+        answered_questions__question__quiz=F("quiz"),
+    )
+    return user_progresses.annotate(
+        answered_count=Count("answered_questions__question", distinct=True),
+        correct_count=Count(
+            "answered_questions__answer",
+            distinct=True,
+            filter=valid_selection & Q(answered_questions__answer__is_correct=True),
+        ),
+        wrong_count=Count(
+            "answered_questions__answer",
+            distinct=True,
+            filter=valid_selection & Q(answered_questions__answer__is_correct=False),
+        ),
+    )
+
+
+def build_score(totals, questions_answered, correct_selections, wrong_selections):
+    """
+    This function combines the quiz totals and a user's selections into a score summary.
+
+    Args:
+        totals (dict): The quiz totals as returned by ``get_quiz_totals``.
+        questions_answered (int): The number of distinct questions the user answered.
+        correct_selections (int): The number of correct answers the user selected.
+        wrong_selections (int): The number of wrong answers the user selected.
+
+    Returns:
+        dict: The score summary of the user.
+    """
+    return {
+        "completed": questions_answered == totals["total_questions"],
+        "questions_answered": questions_answered,
+        "total_questions": totals["total_questions"],
+        "correct_answers": correct_selections + totals["incorrect_answers"] - wrong_selections,
+        "total_answers": totals["total_answers"],
+    }
+
+
+def score_progress(user_progress, totals=None):
+    """
+    This function computes the score summary of a user's progress in a quiz.
+
+    Args:
+        user_progress (UserQuizProgress): The progress to score.
+        totals (dict, optional): Precomputed quiz totals, to avoid querying them again.
+
+    Returns:
+        dict: The score summary of the user.
+    """
+    if totals is None:
+        totals = get_quiz_totals(user_progress.quiz)
+    selections = annotate_selections(UserQuizProgress.objects.filter(id=user_progress.id)).values(
+        "answered_count", "correct_count", "wrong_count"
+    )[0]
+    return build_score(totals, selections["answered_count"], selections["correct_count"], selections["wrong_count"])
+
+
+def score_quiz(quiz):
+    """
+    This function computes the score summaries of all participants of a quiz.
+
+    The cost is two queries, one for the quiz totals and one grouped query for all participants, no matter how many
+    participants, questions or answers the quiz has.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+
+    Returns:
+        list: The score summaries of all participants, in the order they joined the quiz.
+    """
+    totals = get_quiz_totals(quiz)
+    user_progresses = annotate_selections(UserQuizProgress.objects.filter(quiz=quiz)).order_by("id")
+
+    scores = []
+    for row in user_progresses.values("user__username", "answered_count", "correct_count", "wrong_count"):
+        score = build_score(totals, row["answered_count"], row["correct_count"], row["wrong_count"])
+        scores.append({"user": row["user__username"], **score})
+    return scores
+
+
+def stored_progress_score(user_progress, totals=None):
+    """
+    This function reads the score summary of a user's progress from its denormalized counters.
+
+    Args:
+        user_progress (UserQuizProgress): The progress to read the score of.
+        totals (dict, optional): Precomputed quiz totals, to avoid querying them again.
+
+    Returns:
+        dict: The score summary of the user.
+    """
+    if totals is None:
+        totals = get_quiz_totals(user_progress.quiz)
+    return build_score(
+        totals, user_progress.questions_answered, user_progress.correct_selections, user_progress.wrong_selections
+    )
+
+
+def stored_quiz_scores(quiz):
+    """
+    This function reads the score summaries of all participants of a quiz from their denormalized counters.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+
+    Returns:
+        list: The score summaries of all participants, in the order they joined the quiz.
+    """
+    totals = get_quiz_totals(quiz)
+    user_progresses = UserQuizProgress.objects.filter(quiz=quiz).order_by("id")
+
+    scores = []
+    for row in user_progresses.values("user__username", "questions_answered", "correct_selections", "wrong_selections"):
+        score = build_score(totals, row["questions_answered"], row["correct_selections"], row["wrong_selections"])
+        scores.append({"user": row["user__username"], **score})
+    return scores
+
+
+def increment_counters(
+    user_progress_id, total_questions, questions_answered=0, correct_selections=0, wrong_selections=0, **fields
+):
+    """
+    This function atomically adds to the denormalized counters of a progress.
+
+    The counters are updated with F-expressions in a single UPDATE, so concurrent answers of the same user never
+    overwrite each other. The progress is marked as completed once all questions of the quiz have been answered, and
+    is moved in the score histogram of the quiz after the commit if its score changes. It has to be called in the
+    same transaction as the insert of the answered questions it accounts for.
+
+    Args:
+        user_progress_id (int): The ID of the progress to update.
+        total_questions (int): The number of questions of the quiz.
+        questions_answered (int): The number of newly answered questions.
+        correct_selections (int): The number of newly selected correct answers.
+        wrong_selections (int): The number of newly selected wrong answers.
+        **fields: Other fields of the progress to update in the same statement.
+
+    Returns:
+        int: The number of updated progresses.
+    """
+    user_progress = UserQuizProgress.objects.filter(id=user_progress_id)
+    score_change = correct_selections - wrong_selections
+
+    completes = Q(completed=False, questions_answered__gte=total_questions - questions_answered)
+    updated = user_progress.update(
+        questions_answered=F("questions_answered") + questions_answered,
+        correct_selections=F("correct_selections") + correct_selections,
+        wrong_selections=F("wrong_selections") + wrong_selections,
+        score=F("score") + correct_selections - wrong_selections,
+        completed=Case(When(completes, then=True), default=F("completed")),
+        completed_at=Case(When(completes, then=Now()), default=F("completed_at")),
+        **fields,
+    )
+    if score_change and updated:
+        # the update locks the progress until the commit, no other answer can change the score read back here
+        quiz_id, score = user_progress.values_list("quiz_id", "score").first()
+        move_score_on_commit(quiz_id, score - score_change, score)
+    return updated
+
+
+def rebuild_quiz_counters(quiz, batch_size=1000):
+    """
+    This function recomputes the denormalized counters of all participants of a quiz from their answered questions.
+
+    The score histogram of the quiz is rebuilt from the new scores.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+        batch_size (int): The number of progresses to update per query.
+
+    Returns:
+        int: The number of rebuilt progresses.
+    """
+    totals = get_quiz_totals(quiz)
+    fields = ["questions_answered", "correct_selections", "wrong_selections", "score", "completed", "completed_at"]
+
+    user_progresses = []
+    for user_progress in annotate_selections(UserQuizProgress.objects.filter(quiz=quiz)).order_by("id"):
+        score = build_score(
+            totals, user_progress.answered_count, user_progress.correct_count, user_progress.wrong_count
+        )
+        user_progress.questions_answered = user_progress.answered_count
+        user_progress.correct_selections = user_progress.correct_count
+        user_progress.wrong_selections = user_progress.wrong_count
+        user_progress.score = score["correct_answers"]
+        if score["completed"] and not user_progress.completed_at:
+            user_progress.completed_at = timezone.now()
+        user_progress.completed = score["completed"]
+        user_progresses.append(user_progress)
+
+    UserQuizProgress.objects.bulk_update(user_progresses, fields, batch_size=batch_size)
+    rebuild_score_histogram(quiz.id)
+    return len(user_progresses)
+
+
+def check_quiz_counters(quiz):
+    """
+    This function compares the denormalized counters of all participants of a quiz with their answered questions.
+
+    It only reads, so it is safe to run against production data.
+
+    Args:
+        quiz (Quiz): The quiz, ideally fetched with its status.
+
+    Returns:
+        list: One entry per inconsistent counter, with the progress, the field, the stored and the expected value.
+    """
+    totals = get_quiz_totals(quiz)
+
+    mismatches = []
+    for user_progress in annotate_selections(UserQuizProgress.objects.filter(quiz=quiz)).order_by("id"):
+        score = build_score(
+            totals, user_progress.answered_count, user_progress.correct_count, user_progress.wrong_count
+        )
+        expected = {
+            "questions_answered": user_progress.answered_count,
+            "correct_selections": user_progress.correct_count,
+            "wrong_selections": user_progress.wrong_count,
+            "score": score["correct_answers"],
+            "completed": score["completed"],
+        }
+        for field, value in expected.items():
+            if getattr(user_progress, field) != value:
+                mismatches.append(
+                    {
+                        "progress_id": user_progress.id,
+                        "field": field,
+                        "stored": getattr(user_progress, field),
+                        "expected": value,
+                    }
+                )
+    return mismatches
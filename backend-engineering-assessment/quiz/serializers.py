@@ -16,6 +16,7 @@ from .models import Question
 from .models import Answer
 from .models import Role
 from .models import Quiz
+from .models import Job
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -162,6 +163,40 @@ class AnswerSerializer(serializers.ModelSerializer):
         return representation
 
 
+class AnswerOptionSerializer(serializers.ModelSerializer):
+    """
+    This serializer is used to serialize the Answer model for participants, without revealing whether it is correct.
+    """
+
+    class Meta:
+        model = Answer
+        fields = ["id", "answer"]
+
+
+class NextQuestionSerializer(serializers.ModelSerializer):
+    """
+    This serializer is used to serialize the next question of a participant together with its answer options.
+    """
+
+    answers = AnswerOptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ["id", "question", "position", "answers"]
+
+
+class QuizSnapshotSerializer(serializers.ModelSerializer):
+    """
+    This serializer is used to serialize the whole content of a quiz for participants, without the correct answers.
+    """
+
+    questions = NextQuestionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Quiz
+        fields = ["id", "title", "description", "questions"]
+
+
 class AssignedQuizSerializer(serializers.ModelSerializer):
     """
     This serializer is used to serialize the AssignedQuiz model.
@@ -244,3 +279,16 @@ class AnsweredQuestionSerializer(serializers.ModelSerializer):
         representation["answer_id"] = instance.answer.id
         representation["is_correct"] = instance.answer.is_correct
         return representation
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    This serializer is used to serialize the Job model.
+    """
+
+    id = serializers.ReadOnlyField()
+    quiz_id = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Job
+        fields = ["id", "kind", "quiz_id", "status", "error", "created_at", "started_at", "finished_at"]
@@ -0,0 +1,64 @@
+"""
+This module contains the signal receivers of the quiz app, connected when the app is ready.
+"""
+
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.db import transaction
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_user_tokens
+from .authentication import invalidate_token
+
+from .answers import count_answered_question
+
+from .roles import invalidate_user_role
+from .roles import invalidate_roles
+
+from .models import AnsweredQuestion
+from .models import UserProfile
+from .models import Role
+from .models import Quiz
+from .models import User
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    invalidate_user_role(instance.user_id)
+    # the cached tokens carry the role of the user
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def role_changed(sender, instance, **kwargs):
+    invalidate_roles()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        # the ID of a deleted user can be reused, a new user must never inherit its cached role
+        invalidate_user_role(instance.id)
+    elif update_fields != frozenset({"last_login"}):
+        # deactivating the user must take effect
+        invalidate_user_tokens(instance.id)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=AnsweredQuestion)
+def answered_question_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # the app bulk inserts answers and counts them itself, this keeps the score counters right for answers saved
+        # one by one, for example from the admin or a shell
+        with transaction.atomic():
+            quiz = Quiz.objects.select_related("status").get(user_progresses=instance.progress_id)
+            count_answered_question(instance, quiz)
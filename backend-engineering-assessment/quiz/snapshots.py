@@ -0,0 +1,76 @@
+"""
+This module contains the content snapshots of published quizzes.
+
+The questions and answers of a quiz can no longer change once it left the Draft status, so its whole content is
+serialized once per quiz version, rendered to JSON bytes and cached in process and in the Django cache together with a
+strong ETag. Serving a snapshot is then a cache lookup, and clients that already have it get a 304 response.
+"""
+
+from hashlib import sha256
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from rest_framework.renderers import JSONRenderer
+
+from .answer_key import get_quiz_version
+
+from .cache import TieredCache
+
+from .serializers import QuizSnapshotSerializer
+
+from .models import Question
+from .models import Answer
+from .models import Quiz
+
+
+snapshots = TieredCache(
+    "quiz:snapshot",
+    maxsize=getattr(settings, "QUIZ_SNAPSHOT_CACHE_SIZE", 64),
+    timeout=getattr(settings, "QUIZ_SNAPSHOT_CACHE_TIMEOUT", 3600),
+)
+
+
+class QuizSnapshot:
+    """
+    This class holds the rendered content of a quiz and its ETag.
+    """
+
+    def __init__(self, version, content):
+        self.version = version
+        self.content = content
+        self.etag = f'"{sha256(content).hexdigest()}"'
+
+
+def build_snapshot(quiz):
+    """
+    This function serializes and renders the content of a quiz.
+
+    Args:
+        quiz (Quiz): The quiz.
+
+    Returns:
+        QuizSnapshot: The snapshot of the quiz.
+    """
+    answers = Answer.objects.order_by("id")
+    questions = Question.objects.order_by("position").prefetch_related(Prefetch("answers", queryset=answers))
+    quiz = Quiz.objects.prefetch_related(Prefetch("questions", queryset=questions)).get(id=quiz.id)
+    content = JSONRenderer().render(QuizSnapshotSerializer(quiz).data)
+    return QuizSnapshot(get_quiz_version(quiz), content)
+
+
+def get_snapshot(quiz):
+    """
+    This function returns the snapshot of a published quiz, building it if it is not cached for its version yet.
+
+    Args:
+        quiz (Quiz): The quiz.
+
+    Returns:
+        QuizSnapshot: The snapshot of the quiz.
+    """
+    snapshot = snapshots.get(quiz.id)
+    if snapshot is None or snapshot.version != get_quiz_version(quiz):
+        snapshot = build_snapshot(quiz)
+        snapshots.set(quiz.id, snapshot)
+    return snapshot
@@ -4,13 +4,43 @@ This module contains all the tests for the API endpoints in the quiz app.
 Written by: Moritz Patek | patekmoritz@yahoo.at
 """
 
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import Future
+from datetime import timedelta
+import threading
+import asyncio
+import random
+import json
+import pickle
+
+import numpy as np
+from unittest import mock
+from io import StringIO
+import tempfile
+import os
+
+from asgiref.sync import sync_to_async
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
+from django.utils.http import http_date
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from django.test import AsyncClient
 from django.test import TestCase
+from django.db import IntegrityError
+from django.db import transaction
+from django.db import connection
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from .models import AnsweredQuestion
+from .models import PendingAnswer
 from .models import UserQuizProgress
 from .models import AssignedQuiz
 from .models import UserProfile
@@ -18,7 +48,70 @@ from .models import QuizStatus
 from .models import Question
 from .models import Answer
 from .models import Role
+from .models import QuizScoreBucket
 from .models import Quiz
+from .models import Job
+
+from .answer_key import get_answer_key
+from .answer_key import answer_keys
+
+from .analytics import item_analyses
+from .analytics import analyse_quiz
+from .analytics import get_item_analysis
+
+from .jobs import execute_job
+from .jobs import claim_job
+from .jobs import JOB_KINDS
+
+from .management.commands.run_jobs import Command as RunJobsCommand
+
+from .histogram import get_score_rank
+from .histogram import rebuild_score_histogram
+
+from .progress import find_next_question
+
+from .snapshots import snapshots
+
+from .live import iter_score_events
+from .live import quiz_channel
+from .live import CacheBroker
+from .live import LocalBroker
+from .live import get_broker
+from .live import RESET
+
+from .throttling import TokenBuckets
+from .throttling import get_question_quiz
+from .throttling import question_quizzes
+from .throttling import buckets
+
+from .roles import get_user_role
+from .roles import role_cache
+from .roles import NO_PROFILE
+from .roles import get_role_capabilities
+from .roles import invalidate_roles
+from .roles import Capability
+
+from .authentication import tokens
+from .authentication import token_cache_key
+
+from rest_framework.authtoken.models import Token
+
+from .provisioning import iter_jsonl_rows
+from .provisioning import iter_csv_rows
+from .provisioning import import_users
+
+from .answers import record_answers
+from .answers import lock_progress
+from .answers import record_answer
+
+from .grading import grade_quiz
+from .grading import save_grades
+
+from .scoring import score_progress
+from .scoring import score_quiz
+from .scoring import rebuild_quiz_counters
+from .scoring import check_quiz_counters
+from .scoring import stored_quiz_scores
 
 
 from django.urls import reverse
@@ -354,6 +447,65 @@ class CreateAnsweredQuestionTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data["error"], "Answer does not exist.")
 
+    def test_create_answered_question_with_answer_of_another_question(self):
+        self.client.login(username="testuser", password="password123")
+        other_question = Question.objects.create(quiz=self.quiz, question="What is the capital of Italy?")
+        other_answer = Answer.objects.create(question=other_question, answer="Rome", is_correct=True)
+
+        data = {"question_id": self.question.id, "answer_id": other_answer.id}
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Answer does not belong to the question.")
+        self.assertFalse(AnsweredQuestion.objects.exists())
+
+    def test_create_answered_question_in_unpublished_quiz(self):
+        self.client.login(username="testuser", password="password123")
+        self.quiz.status = QuizStatus.objects.create(name="Closed", description="Quiz is closed")
+        self.quiz.save()
+
+        data = {"question_id": self.question.id, "answer_id": self.answer.id}
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Quiz is not published.")
+        self.assertFalse(AnsweredQuestion.objects.exists())
+
+    def test_create_answered_question_without_progress(self):
+        User.objects.create_user(username="outsider", password="password123")
+        self.client.login(username="outsider", password="password123")
+
+        data = {"question_id": self.question.id, "answer_id": self.answer.id}
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(AnsweredQuestion.objects.exists())
+
+    def test_create_answered_question_resolves_submission_with_one_query(self):
+        self.client.force_authenticate(user=self.user)
+        data = {"question_id": self.question.id, "answer_id": self.answer.id}
+        # during a live quiz the answer key and the quiz of the question are cached, and the histogram has its buckets
+        get_answer_key(self.quiz)
+        get_question_quiz(self.question.id)
+        rebuild_score_histogram(self.quiz.id)
+        QuizScoreBucket.objects.create(quiz=self.quiz, score=1, participants=0)
+
+        with self.assertNumQueries(14) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statements = [query["sql"].split()[0].upper() for query in queries.captured_queries]
+        # question, answer, quiz status and progress are all resolved with one query, the other one locks the progress
+        self.assertEqual(statements[: statements.index("INSERT")].count("SELECT"), 2)
+        # the transaction recording the answer: the insert, the check for an earlier answer to the question, the
+        # update of the counters and the new score read back, then the histogram move once it is committed. The
+        # transactions are savepoints in the test
+        self.assertEqual(
+            statements,
+            ["SELECT", "SAVEPOINT", "SELECT", "SAVEPOINT", "INSERT", "RELEASE", "SELECT", "UPDATE", "SELECT", "RELEASE"]
+            + ["SAVEPOINT", "UPDATE", "UPDATE", "RELEASE"],
+        )
+
 
 class SetQuizToUserTests(TestCase):
     def setUp(self):
@@ -899,9 +1051,9 @@ class GetNextQuestionTests(TestCase):
         self.question1 = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
         self.question2 = Question.objects.create(quiz=self.quiz, question="What is 2 + 2?")
 
-        # Create user quiz progress
+        # Create user quiz progress, past the first question
         self.user_progress = UserQuizProgress.objects.create(
-            user=self.user, quiz=self.quiz, last_answered_question=self.question1
+            user=self.user, quiz=self.quiz, last_answered_question=self.question1, cursor=self.question1.position
         )
 
         # create answers for the questions
@@ -964,4 +1116,1695 @@ class GetAllUsersTests(TestCase):
 
         # Check that the users were retrieved successfully
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNone(response.data["next_cursor"])
+
+    def test_pages_follow_the_cursor(self):
+        self.client.login(username="creator", password="password123")
+
+        response = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual([user["username"] for user in response.data["results"]], ["creator", "user1"])
+        self.assertEqual(response.data["results"][0]["role_name"], "Creator")
+
+        response = self.client.get(self.url, {"page_size": 2, "cursor": response.data["next_cursor"]})
+        self.assertEqual([user["username"] for user in response.data["results"]], ["user2"])
+        self.assertIsNone(response.data["next_cursor"])
+
+    def test_search_matches_username_or_email_prefix(self):
+        User.objects.create_user(username="alice", email="user3@example.com")
+        self.client.login(username="creator", password="password123")
+
+        response = self.client.get(self.url, {"search": "user"})
+        self.assertEqual([user["username"] for user in response.data["results"]], ["alice", "user1", "user2"])
+
+        response = self.client.get(self.url, {"search": "cre"})
+        self.assertEqual([user["username"] for user in response.data["results"]], ["creator"])
+
+        # The search is a prefix, case-sensitive like usernames
+        response = self.client.get(self.url, {"search": "USER"})
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(self.url, {"search": "example"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_role_filter(self):
+        participant_role = Role.objects.create(name="Participant", description="Can take quizzes", level=100)
+        UserProfile.objects.create(user=User.objects.get(username="user2"), role=participant_role)
+        self.client.login(username="creator", password="password123")
+
+        response = self.client.get(self.url, {"role": "Participant"})
+        self.assertEqual([user["username"] for user in response.data["results"]], ["user2"])
+
+        response = self.client.get(self.url, {"role": "Participant", "search": "user1"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_queries_do_not_grow_with_users(self):
+        participant_role = Role.objects.create(name="Participant", description="Can take quizzes", level=100)
+        self.client.login(username="creator", password="password123")
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as few_users:
+            self.client.get(self.url)
+        for i in range(10):
+            user = User.objects.create_user(username=f"participant{i}")
+            UserProfile.objects.create(user=user, role=participant_role)
+        with CaptureQueriesContext(connection) as many_users:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data["results"]), 13)
+        self.assertEqual(len(many_users), len(few_users))
+
+    def test_invalid_parameters(self):
+        self.client.login(username="creator", password="password123")
+
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Invalid cursor.")
+
+        response = self.client.get(self.url, {"page_size": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def legacy_progress_score(user_progress):
+    """
+    The original per-answer loop of get_participant_quiz_progress, kept as the reference for the scoring engine.
+    """
+    quiz = user_progress.quiz
+    answered_questions = AnsweredQuestion.objects.filter(progress=user_progress)
+    total_questions = Question.objects.filter(quiz=quiz)
+
+    questions_answered = []
+    correct_answers = 0
+    total_answers = 0
+
+    for question in total_questions:
+        for answer in Answer.objects.filter(question=question):
+            total_answers += 1
+            selected = AnsweredQuestion.objects.filter(
+                progress=user_progress, question=question, answer=answer
+            ).exists()
+            if selected == answer.is_correct:
+                correct_answers += 1
+
+    for answered_question in answered_questions:
+        if answered_question.question not in questions_answered:
+            questions_answered.append(answered_question.question)
+
+    return {
+        "completed": len(questions_answered) == total_questions.count(),
+        "questions_answered": len(questions_answered),
+        "total_questions": total_questions.count(),
+        "correct_answers": correct_answers,
+        "total_answers": total_answers,
+    }
+
+
+def create_random_quiz(rng, creator, quiz_status, participants):
+    """
+    Creates a quiz with a random number of questions and answers, and random answers for every participant.
+    """
+    quiz = Quiz.objects.create(title="Random Quiz", created_by=creator, status=quiz_status)
+    questions = []
+    for index in range(rng.randint(0, 6)):
+        question = Question.objects.create(quiz=quiz, question=f"Question {index}")
+        answers = [
+            Answer.objects.create(question=question, answer=f"Answer {n}", is_correct=rng.random() < 0.4)
+            for n in range(rng.randint(0, 4))
+        ]
+        questions.append((question, answers))
+
+    progresses = []
+    for participant in participants:
+        user_progress = UserQuizProgress.objects.create(user=participant, quiz=quiz)
+        for question, answers in questions:
+            for answer in answers:
+                if rng.choice([0, 0, 1, 2]):
+                    AnsweredQuestion.objects.create(progress=user_progress, question=question, answer=answer)
+        progresses.append(user_progress)
+    return quiz, progresses
+
+
+class ScoringEngineTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        self.participants = [User.objects.create_user(username=f"participant{n}") for n in range(3)]
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+
+    def test_score_progress_matches_legacy_loop(self):
+        rng = random.Random(1234)
+        for _ in range(15):
+            _, progresses = create_random_quiz(rng, self.creator, self.quiz_status, self.participants)
+            for user_progress in progresses:
+                self.assertEqual(score_progress(user_progress), legacy_progress_score(user_progress))
+
+    def test_score_progress_uses_constant_number_of_queries(self):
+        quiz = Quiz.objects.create(title="Large Quiz", created_by=self.creator, status=self.quiz_status)
+        user_progress = UserQuizProgress.objects.create(user=self.participants[0], quiz=quiz)
+        for index in range(20):
+            question = Question.objects.create(quiz=quiz, question=f"Question {index}")
+            answer = Answer.objects.create(question=question, answer="Answer", is_correct=True)
+            AnsweredQuestion.objects.create(progress=user_progress, question=question, answer=answer)
+
+        # The answer key of the Published quiz is compiled once, and then read from the cache
+        answer_keys.delete(quiz.id)
+        with self.assertNumQueries(3):
+            score_progress(user_progress)
+        with self.assertNumQueries(1):
+            score = score_progress(user_progress)
+        self.assertEqual(score["questions_answered"], 20)
+        self.assertEqual(score["correct_answers"], 20)
+
+    def test_score_quiz_matches_legacy_loop(self):
+        rng = random.Random(4321)
+        for _ in range(10):
+            quiz, progresses = create_random_quiz(rng, self.creator, self.quiz_status, self.participants)
+            expected = [
+                {"user": user_progress.user.username, **legacy_progress_score(user_progress)}
+                for user_progress in progresses
+            ]
+            self.assertEqual(score_quiz(quiz), expected)
+
+    def test_score_quiz_uses_constant_number_of_queries(self):
+        rng = random.Random(99)
+        quiz, _ = create_random_quiz(rng, self.creator, self.quiz_status, self.participants)
+        more_participants = [User.objects.create_user(username=f"late{n}") for n in range(10)]
+        bigger_quiz, _ = create_random_quiz(rng, self.creator, self.quiz_status, more_participants)
+
+        score_quiz(quiz)
+        score_quiz(bigger_quiz)
+
+        with self.assertNumQueries(1):
+            score_quiz(quiz)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(score_quiz(bigger_quiz)), 10)
+
+
+class ScoreCounterTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        self.participant = User.objects.create_user(username="participant", password="password123")
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.creator, status=self.quiz_status)
+
+        self.question1 = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        self.answer1 = Answer.objects.create(question=self.question1, answer="Paris", is_correct=True)
+        self.answer2 = Answer.objects.create(question=self.question1, answer="Lyon", is_correct=False)
+        self.question2 = Question.objects.create(quiz=self.quiz, question="What is 2 + 2?")
+        self.answer3 = Answer.objects.create(question=self.question2, answer="4", is_correct=True)
+        self.answer4 = Answer.objects.create(question=self.question2, answer="3", is_correct=False)
+
+        AssignedQuiz.objects.create(user=self.participant, quiz=self.quiz)
+        self.client = APIClient()
+        self.client.login(username="participant", password="password123")
+        self.client.post(reverse("set_accepted_status"), {"quiz_id": self.quiz.id, "accepted": True}, format="json")
+        self.user_progress = UserQuizProgress.objects.get(user=self.participant, quiz=self.quiz)
+
+    def answer(self, question, answer):
+        data = {"question_id": question.id, "answer_id": answer.id}
+        return self.client.post(reverse("create_answered_question"), data, format="json")
+
+    def test_counters_follow_answers(self):
+        self.answer(self.question1, self.answer1)
+        self.answer(self.question1, self.answer2)
+        self.answer(self.question1, self.answer2)
+
+        self.user_progress.refresh_from_db()
+        self.assertEqual(self.user_progress.questions_answered, 1)
+        self.assertEqual(self.user_progress.correct_selections, 1)
+        self.assertEqual(self.user_progress.wrong_selections, 1)
+        self.assertEqual(self.user_progress.score, score_progress(self.user_progress)["correct_answers"])
+        self.assertFalse(self.user_progress.completed)
+
+        self.answer(self.question2, self.answer3)
+
+        self.user_progress.refresh_from_db()
+        self.assertTrue(self.user_progress.completed)
+        self.assertIsNotNone(self.user_progress.completed_at)
+        self.assertEqual(stored_quiz_scores(self.quiz), score_quiz(self.quiz))
+        self.assertEqual(check_quiz_counters(self.quiz), [])
+
+    def test_repeated_submission_is_recorded_once(self):
+        first = self.answer(self.question1, self.answer1)
+        second = self.answer(self.question1, self.answer1)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["id"], second.data["id"])
+        self.assertEqual(AnsweredQuestion.objects.filter(progress=self.user_progress).count(), 1)
+        self.assertEqual(check_quiz_counters(self.quiz), [])
+
+        # a concurrent retry that got past the view would be rejected by the database
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AnsweredQuestion.objects.create(progress=self.user_progress, question=self.question1, answer=self.answer1)
+
+    def test_rebuild_and_check_command(self):
+        # A bulk insert bypasses the counters, like rows written outside the app
+        AnsweredQuestion.objects.bulk_create(
+            [AnsweredQuestion(progress=self.user_progress, question=self.question2, answer=self.answer4)]
+        )
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_score_counters", self.quiz.id, "--check", stdout=StringIO())
+        self.assertEqual(len(check_quiz_counters(self.quiz)), 3)
+
+        call_command("rebuild_score_counters", self.quiz.id, stdout=StringIO())
+
+        self.user_progress.refresh_from_db()
+        self.assertEqual(self.user_progress.questions_answered, 1)
+        self.assertEqual(self.user_progress.wrong_selections, 1)
+        self.assertEqual(check_quiz_counters(self.quiz), [])
+
+
+class AnswerKeyTests(TestCase):
+    def setUp(self):
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        UserProfile.objects.create(user=self.user, role=self.creator_role)
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.draft_status = QuizStatus.objects.create(name="Draft", description="Quiz is in draft state")
+        QuizStatus.objects.create(name="Published", description="Quiz is published")
+        QuizStatus.objects.create(name="Closed", description="Quiz is closed")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.user, status=self.draft_status)
+        self.question = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        self.correct = Answer.objects.create(question=self.question, answer="Paris", is_correct=True)
+        self.wrong = Answer.objects.create(question=self.question, answer="Lyon", is_correct=False)
+        self.other_question = Question.objects.create(quiz=self.quiz, question="What is 2 + 2?")
+        Answer.objects.create(question=self.other_question, answer="4", is_correct=True)
+
+        # Quiz IDs are reused between tests, so answer keys of earlier tests must not be found
+        answer_keys.delete(self.quiz.id)
+
+    def set_status(self, name):
+        self.client.post(reverse("set_quiz_status"), {"quiz_id": self.quiz.id, "status": name}, format="json")
+        return Quiz.objects.select_related("status").get(id=self.quiz.id)
+
+    def test_answer_key_is_compiled_when_published(self):
+        quiz = self.set_status("Published")
+
+        with self.assertNumQueries(0):
+            answer_key = get_answer_key(quiz)
+        self.assertEqual(answer_key.questions[self.question.id], ({self.correct.id}, {self.wrong.id}))
+        self.assertEqual(answer_key.totals, {"total_questions": 2, "total_answers": 3, "incorrect_answers": 1})
+        self.assertTrue(answer_key.grade(self.question.id, self.correct.id))
+        self.assertFalse(answer_key.grade(self.question.id, self.wrong.id))
+        self.assertIsNone(answer_key.grade(self.other_question.id, self.correct.id))
+
+    def test_answer_key_is_invalidated_when_status_changes(self):
+        published_quiz = self.set_status("Published")
+        published_key = get_answer_key(published_quiz)
+
+        closed_quiz = self.set_status("Closed")
+        self.assertIsNone(answer_keys.get(self.quiz.id))
+        self.assertIsNot(get_answer_key(closed_quiz), published_key)
+
+    def test_answer_key_of_draft_quiz_is_not_cached(self):
+        quiz = Quiz.objects.select_related("status").get(id=self.quiz.id)
+        get_answer_key(quiz)
+        self.assertIsNone(answer_keys.get(self.quiz.id))
+
+
+class BulkGradingTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        self.participants = [User.objects.create_user(username=f"participant{n}") for n in range(4)]
+        self.closed_status = QuizStatus.objects.create(name="Closed", description="Quiz is closed")
+
+    def test_grades_match_scoring_engine(self):
+        rng = random.Random(2024)
+        for _ in range(10):
+            quiz, _ = create_random_quiz(rng, self.creator, self.closed_status, self.participants)
+            grades = grade_quiz(quiz)
+            self.assertEqual(grades.scores(), score_quiz(quiz))
+
+            save_grades(grades)
+            self.assertEqual(check_quiz_counters(quiz), [])
+
+    def test_question_statistics(self):
+        quiz = Quiz.objects.create(title="Closed Quiz", created_by=self.creator, status=self.closed_status)
+        question = Question.objects.create(quiz=quiz, question="What is the capital of France?")
+        paris = Answer.objects.create(question=question, answer="Paris", is_correct=True)
+        lyon = Answer.objects.create(question=question, answer="Lyon", is_correct=False)
+        for participant, answer in zip(self.participants, [paris, paris, lyon, None]):
+            user_progress = UserQuizProgress.objects.create(user=participant, quiz=quiz)
+            if answer:
+                AnsweredQuestion.objects.create(progress=user_progress, question=question, answer=answer)
+
+        statistics = grade_quiz(quiz).question_statistics()
+
+        self.assertEqual(statistics[0]["question_id"], question.id)
+        self.assertEqual(statistics[0]["correct_rate"], 0.5)
+        pick_rates = {answer["answer_id"]: answer["pick_rate"] for answer in statistics[0]["answers"]}
+        self.assertEqual(pick_rates, {paris.id: 0.5, lyon.id: 0.25})
+
+    def test_question_without_answers_is_answered_correctly_by_everyone(self):
+        quiz = Quiz.objects.create(title="Closed Quiz", created_by=self.creator, status=self.closed_status)
+        question = Question.objects.create(quiz=quiz, question="Any remarks?")
+        for participant in self.participants:
+            UserQuizProgress.objects.create(user=participant, quiz=quiz)
+
+        statistics = grade_quiz(quiz).question_statistics()
+
+        self.assertEqual(statistics, [{"question_id": question.id, "correct_rate": 1.0, "answers": []}])
+
+    def test_grade_quiz_command_requires_closed_quiz(self):
+        published_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        quiz = Quiz.objects.create(title="Open Quiz", created_by=self.creator, status=published_status)
+
+        with self.assertRaises(CommandError):
+            call_command("grade_quiz", quiz.id, stdout=StringIO())
+
+
+class ExportQuizScoresTests(TestCase):
+    def setUp(self):
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        UserProfile.objects.create(user=self.user, role=self.creator_role)
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.user, status=self.quiz_status)
+        question = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        answer = Answer.objects.create(question=question, answer="Paris", is_correct=True)
+        Answer.objects.create(question=question, answer="Lyon", is_correct=False)
+
+        for n in range(3):
+            participant = User.objects.create_user(username=f"participant{n}")
+            user_progress = UserQuizProgress.objects.create(user=participant, quiz=self.quiz)
+            if n:
+                AnsweredQuestion.objects.create(progress=user_progress, question=question, answer=answer)
+
+        self.url = reverse("export_quiz_scores")
+
+    def test_export_csv(self):
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "user,completed,questions_answered,total_questions,correct_answers,total_answers")
+        self.assertEqual(
+            lines[1:], ["participant0,False,0,1,1,2", "participant1,True,1,1,2,2", "participant2,True,1,1,2,2"]
+        )
+
+    def test_export_ndjson(self):
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id, "file_format": "ndjson"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(rows, stored_quiz_scores(self.quiz))
+
+    def test_export_unknown_format(self):
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id, "file_format": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GetQuizLeaderboardTests(TestCase):
+    def setUp(self):
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        UserProfile.objects.create(user=self.user, role=self.creator_role)
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.user, status=self.quiz_status)
+
+        # Scores with ties, broken by completion time, with unfinished participants last
+        base = timezone.now()
+        participants = [
+            ("anna", 5, 3),
+            ("ben", 5, 1),
+            ("carl", 5, None),
+            ("dora", 7, 9),
+            ("emil", 2, None),
+            ("fay", 5, 1),
+            ("gus", 2, 4),
+        ]
+        for username, score, minutes in participants:
+            UserQuizProgress.objects.create(
+                user=User.objects.create_user(username=username),
+                quiz=self.quiz,
+                score=score,
+                completed=minutes is not None,
+                completed_at=base + timedelta(minutes=minutes) if minutes is not None else None,
+            )
+        self.expected = ["dora", "ben", "fay", "anna", "carl", "gus", "emil"]
+
+        self.url = reverse("get_quiz_leaderboard")
+
+    def test_pages_cover_the_leaderboard_in_order(self):
+        users, ranks = [], []
+        cursor = None
+        for _ in range(4):
+            params = {"quiz_id": self.quiz.id, "page_size": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            users += [row["user"] for row in response.data["results"]]
+            ranks += [row["rank"] for row in response.data["results"]]
+            cursor = response.data["next_cursor"]
+
+        self.assertIsNone(cursor)
+        self.assertEqual(users, self.expected)
+        # tied participants share a rank, also across pages
+        self.assertEqual(ranks, [1, 2, 2, 2, 2, 6, 6])
+
+    def test_ranks_match_the_participant_rank(self):
+        rebuild_score_histogram(self.quiz.id)
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+
+        for row in response.data["results"]:
+            score_rank = get_score_rank(self.quiz, row["correct_answers"])
+            self.assertEqual(row["rank"], score_rank["rank"], row["user"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id, "cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_leaderboard_forbidden_for_non_creator(self):
+        other_user = User.objects.create_user(username="otheruser", password="password123")
+        UserProfile.objects.create(user=other_user, role=self.creator_role)
+        self.client.login(username="otheruser", password="password123")
+
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ItemAnalysisTests(TestCase):
+    def setUp(self):
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        UserProfile.objects.create(user=self.user, role=self.creator_role)
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.participants = [User.objects.create_user(username=f"participant{n}") for n in range(6)]
+        self.closed_status = QuizStatus.objects.create(name="Closed", description="Quiz is closed")
+
+    def test_analysis_matches_graded_matrix(self):
+        rng = random.Random(77)
+        for _ in range(10):
+            quiz, _ = create_random_quiz(rng, self.user, self.closed_status, self.participants)
+            grades = grade_quiz(quiz)
+            analysis = analyse_quiz(quiz)
+
+            self.assertEqual(analysis["participants"], len(self.participants))
+            for question, statistics in zip(analysis["questions"], grades.question_statistics()):
+                self.assertEqual(question["question_id"], statistics["question_id"])
+                self.assertAlmostEqual(question["difficulty"], statistics["correct_rate"])
+                self.assertEqual(
+                    [(a["answer_id"], a["pick_rate"]) for a in question["answers"]],
+                    [(a["answer_id"], a["pick_rate"]) for a in statistics["answers"]],
+                )
+
+                # The point-biserial coefficient is the Pearson correlation of the item and the total scores
+                columns = np.flatnonzero(grades.answer_questions == question["question_id"])
+                item_scores = grades.matches[:, columns].all(axis=1).astype(float)
+                if question["discrimination"] is None:
+                    continue
+                expected = np.corrcoef(item_scores, grades.correct_answers.astype(float))[0, 1]
+                self.assertAlmostEqual(question["discrimination"], expected)
+
+    def test_analysis_endpoint_is_cached(self):
+        quiz, _ = create_random_quiz(random.Random(5), self.user, self.closed_status, self.participants)
+        item_analyses.delete(quiz.id)
+        url = reverse("get_quiz_item_analysis")
+
+        response = self.client.get(url, {"quiz_id": quiz.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, analyse_quiz(quiz))
+
+        quiz = Quiz.objects.select_related("status").get(id=quiz.id)
+        with self.assertNumQueries(0):
+            get_item_analysis(quiz)
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        UserProfile.objects.create(user=self.user, role=self.creator_role)
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Closed", description="Quiz is closed")
+        self.quiz, self.progresses = create_random_quiz(
+            random.Random(11), self.user, self.quiz_status, [User.objects.create_user(username="participant")]
+        )
+
+    def run_jobs(self):
+        call_command("run_jobs", "--once", "--workers", "0", stdout=StringIO())
+
+    def test_recompute_scores_job(self):
+        response = self.client.post(
+            reverse("create_job"), {"quiz_id": self.quiz.id, "kind": "recompute_scores"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], Job.PENDING)
+        job_id = response.data["id"]
+
+        response = self.client.get(reverse("get_job_result"), {"job_id": job_id})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.run_jobs()
+
+        response = self.client.get(reverse("get_job_status"), {"job_id": job_id})
+        self.assertEqual(response.data["status"], Job.SUCCEEDED)
+        response = self.client.get(reverse("get_job_result"), {"job_id": job_id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"participants": 1})
+        self.assertEqual(check_quiz_counters(self.quiz), [])
+
+    def test_failing_job_is_recorded(self):
+        job = Job.objects.create(kind="recompute_scores", quiz=self.quiz, created_by=self.user)
+
+        with mock.patch.dict(JOB_KINDS, {"recompute_scores": mock.Mock(side_effect=RuntimeError("boom"))}):
+            self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("boom", job.error)
+
+    def test_job_is_claimed_once(self):
+        Job.objects.create(kind="item_analysis", quiz=self.quiz, created_by=self.user)
+
+        job_id = claim_job()
+        self.assertIsNotNone(job_id)
+        self.assertIsNone(claim_job())
+        self.assertEqual(Job.objects.get(id=job_id).status, Job.RUNNING)
+
+    def test_unknown_job_kind(self):
+        response = self.client.post(reverse("create_job"), {"quiz_id": self.quiz.id, "kind": "unknown"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Job.objects.count(), 0)
+
+    def test_regrade_refuses_quiz_that_is_not_closed(self):
+        self.quiz_status.name = "Published"
+        self.quiz_status.save()
+        job = Job.objects.create(kind="regrade_quiz", quiz=self.quiz, created_by=self.user)
+
+        self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("Only closed quizzes can be regraded.", job.error)
+
+    def test_stale_running_jobs_are_reclaimed(self):
+        stale = Job.objects.create(
+            kind="item_analysis",
+            quiz=self.quiz,
+            created_by=self.user,
+            status=Job.RUNNING,
+            started_at=timezone.now() - timedelta(hours=2),
+        )
+        running = Job.objects.create(
+            kind="item_analysis", quiz=self.quiz, created_by=self.user, status=Job.RUNNING, started_at=timezone.now()
+        )
+
+        self.run_jobs()
+
+        stale.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(stale.status, Job.SUCCEEDED)
+        self.assertEqual(running.status, Job.RUNNING)
+
+    def test_crashed_worker_fails_its_job_and_restarts_the_pool(self):
+        class BrokenPool:
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+                return future
+
+            def shutdown(self, **kwargs):
+                pass
+
+        class InlinePool(BrokenPool):
+            def submit(self, fn, job_id):
+                future = Future()
+                future.set_result(execute_job(job_id))
+                return future
+
+        crashed = Job.objects.create(kind="item_analysis", quiz=self.quiz, created_by=self.user)
+        succeeded = Job.objects.create(kind="item_analysis", quiz=self.quiz, created_by=self.user)
+
+        with mock.patch.object(RunJobsCommand, "start_pool", side_effect=[BrokenPool(), InlinePool()]) as start_pool:
+            call_command("run_jobs", "--once", "--workers", "1", stdout=StringIO())
+
+        crashed.refresh_from_db()
+        succeeded.refresh_from_db()
+        self.assertEqual(crashed.status, Job.FAILED)
+        self.assertIn("crashed", crashed.error)
+        self.assertEqual(succeeded.status, Job.SUCCEEDED)
+        self.assertEqual(start_pool.call_count, 2)
+
+
+class ScoreHistogramTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.participants = [User.objects.create_user(username=f"participant{n}") for n in range(12)]
+
+    def histogram(self, quiz):
+        buckets = QuizScoreBucket.objects.filter(quiz=quiz, participants__gt=0)
+        return dict(buckets.values_list("score", "participants"))
+
+    def test_rank_matches_all_participants(self):
+        rng = random.Random(10)
+        for _ in range(5):
+            quiz, _ = create_random_quiz(rng, self.creator, self.quiz_status, self.participants)
+            rebuild_quiz_counters(quiz)
+
+            scores = list(UserQuizProgress.objects.filter(quiz=quiz).values_list("score", flat=True))
+            for score in set(scores):
+                below = sum(other < score for other in scores)
+                same = scores.count(score)
+                self.assertEqual(
+                    get_score_rank(quiz, score),
+                    {
+                        "score": score,
+                        "rank": sum(other > score for other in scores) + 1,
+                        "participants": len(scores),
+                        "percentile": round((below + same / 2) / len(scores) * 100, 2),
+                    },
+                )
+
+    def test_histogram_follows_answers(self):
+        quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.creator, status=self.quiz_status)
+        question = Question.objects.create(quiz=quiz, question="What is the capital of France?")
+        correct = Answer.objects.create(question=question, answer="Paris", is_correct=True)
+        wrong = Answer.objects.create(question=question, answer="Lyon", is_correct=False)
+
+        client = APIClient()
+        for participant, answers in zip(self.participants, [[correct], [wrong], [correct, wrong], []]):
+            participant.set_password("password123")
+            participant.save()
+            AssignedQuiz.objects.create(user=participant, quiz=quiz)
+            client.login(username=participant.username, password="password123")
+            client.post(reverse("set_accepted_status"), {"quiz_id": quiz.id, "accepted": True}, format="json")
+            for answer in answers:
+                data = {"question_id": question.id, "answer_id": answer.id}
+                # the histogram is updated once the answer is committed
+                with self.captureOnCommitCallbacks(execute=True):
+                    client.post(reverse("create_answered_question"), data, format="json")
+
+        self.assertEqual(self.histogram(quiz), {2: 1, 1: 2, 0: 1})
+
+        response = client.get(reverse("get_participant_quiz_rank"), {"quiz_id": quiz.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rank"], 2)
+        self.assertEqual(response.data["percentile"], 50.0)
+
+        client.post(reverse("set_accepted_status"), {"quiz_id": quiz.id, "accepted": False}, format="json")
+        self.assertEqual(self.histogram(quiz), {2: 1, 1: 1, 0: 1})
+
+    def test_rank_requires_progress(self):
+        quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.creator, status=self.quiz_status)
+        client = APIClient()
+        client.login(username="creator", password="password123")
+
+        response = client.get(reverse("get_participant_quiz_rank"), {"quiz_id": quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NextQuestionCursorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.user, status=self.quiz_status)
+        self.questions = []
+        for n in range(6):
+            question = Question.objects.create(quiz=self.quiz, question=f"Question {n}")
+            Answer.objects.create(question=question, answer="Answer", is_correct=True)
+            self.questions.append(question)
+        self.user_progress = UserQuizProgress.objects.create(user=self.user, quiz=self.quiz)
+
+    def test_positions_are_dense_per_quiz(self):
+        other_quiz = Quiz.objects.create(title="Other Quiz", created_by=self.user, status=self.quiz_status)
+        other_question = Question.objects.create(quiz=other_quiz, question="Question")
+
+        self.assertEqual([question.position for question in self.questions], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(other_question.position, 1)
+
+    def test_lookup_follows_cursor_in_one_query(self):
+        # the participant answers out of order, answered questions after the cursor are skipped
+        for index in [0, 2, 1]:
+            question = self.questions[index]
+            record_answer(self.user_progress, question, question.answers.first())
+
+        self.user_progress.refresh_from_db()
+        self.assertEqual(self.user_progress.cursor, self.questions[1].position)
+        with self.assertNumQueries(1):
+            self.assertEqual(find_next_question(self.user_progress), self.questions[3])
+
+        response = self.client.get(reverse("get_next_question"), {"quiz_id": self.quiz.id})
+        self.assertEqual(response.data["id"], self.questions[3].id)
+
+    def test_saving_progress_keeps_its_cursor(self):
+        self.user_progress.last_answered_question = self.questions[0]
+        self.user_progress.cursor = self.questions[2].position
+        self.user_progress.save()
+        self.user_progress.completed = True
+        self.user_progress.save(update_fields=["completed"])
+
+        self.user_progress.refresh_from_db()
+        self.assertEqual(self.user_progress.cursor, self.questions[2].position)
+
+    def test_next_question_without_progress(self):
+        other_quiz = Quiz.objects.create(title="Other Quiz", created_by=self.user, status=self.quiz_status)
+
+        response = self.client.get(reverse("get_next_question"), {"quiz_id": other_quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_next_question", "--questions", "5", "--repeat", "1", stdout=out)
+
+        self.assertIn("question 5:", out.getvalue())
+        self.assertEqual(Quiz.objects.count(), 1)
+
+
+class GetNextQuestionWithAnswersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.user, status=self.quiz_status)
+        self.question1 = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        self.answer1 = Answer.objects.create(question=self.question1, answer="Paris", is_correct=True)
+        self.answer2 = Answer.objects.create(question=self.question1, answer="Lyon", is_correct=False)
+        self.question2 = Question.objects.create(quiz=self.quiz, question="What is 2 + 2?")
+        self.answer3 = Answer.objects.create(question=self.question2, answer="4", is_correct=True)
+        self.user_progress = UserQuizProgress.objects.create(user=self.user, quiz=self.quiz)
+
+        self.url = reverse("get_next_question_with_answers")
+
+    def test_next_question_with_answers(self):
+        # two queries for the session and the user, three for the progress, the question and its answers
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], self.question1.id)
+        self.assertEqual(
+            [dict(answer) for answer in response.data["answers"]],
+            [{"id": self.answer1.id, "answer": "Paris"}, {"id": self.answer2.id, "answer": "Lyon"}],
+        )
+
+        record_answer(self.user_progress, self.question1, self.answer1)
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+        self.assertEqual(response.data["id"], self.question2.id)
+
+        record_answer(self.user_progress, self.question2, self.answer3)
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+        self.assertEqual(response.data["message"], "Quiz completed.")
+
+    def test_quiz_not_published(self):
+        self.quiz.status = QuizStatus.objects.create(name="Closed", description="Quiz is closed")
+        self.quiz.save()
+
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_no_access_without_progress(self):
+        self.user_progress.delete()
+
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BatchAnswerTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        self.participant = User.objects.create_user(username="participant", password="password123")
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.creator, status=self.quiz_status)
+
+        self.questions = []
+        for n in range(4):
+            question = Question.objects.create(quiz=self.quiz, question=f"Question {n}")
+            correct = Answer.objects.create(question=question, answer="Correct", is_correct=True)
+            wrong = Answer.objects.create(question=question, answer="Wrong", is_correct=False)
+            self.questions.append((question, correct, wrong))
+
+        AssignedQuiz.objects.create(user=self.participant, quiz=self.quiz)
+        self.client = APIClient()
+        self.client.login(username="participant", password="password123")
+        self.client.post(reverse("set_accepted_status"), {"quiz_id": self.quiz.id, "accepted": True}, format="json")
+        self.user_progress = UserQuizProgress.objects.select_related("quiz__status").get(
+            user=self.participant, quiz=self.quiz
+        )
+        self.url = reverse("create_answered_questions")
+
+    def post(self, answers):
+        data = {"quiz_id": self.quiz.id, "answers": answers}
+        return self.client.post(self.url, data, format="json")
+
+    def test_batch_is_validated_and_counted_once(self):
+        (question1, correct1, wrong1), (question2, correct2, _), (question3, _, wrong3), _ = self.questions
+        record_answer(self.user_progress, question1, correct1)
+
+        response = self.post(
+            [
+                {"question_id": question1.id, "answer_id": correct1.id},
+                {"question_id": question1.id, "answer_id": wrong1.id},
+                {"question_id": question2.id, "answer_id": correct2.id},
+                {"question_id": question2.id, "answer_id": correct2.id},
+                {"question_id": question2.id, "answer_id": wrong3.id},
+                {"question_id": question3.id, "answer_id": 0},
+                {"question_id": 0, "answer_id": correct1.id},
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["already_recorded", "created", "created", "already_recorded", "rejected", "rejected", "rejected"],
+        )
+        self.assertEqual(response.data["results"][4]["error"], "Answer does not belong to the question.")
+        self.assertFalse(AnsweredQuestion.objects.filter(answer=wrong3).exists())
+        self.user_progress.refresh_from_db()
+        self.assertEqual(self.user_progress.questions_answered, 2)
+        self.assertEqual(self.user_progress.last_answered_question, question2)
+        self.assertEqual(self.user_progress.cursor, question2.position)
+        self.assertEqual(check_quiz_counters(self.quiz), [])
+        self.assertEqual(get_score_rank(self.quiz, self.user_progress.score)["participants"], 1)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        selections = [(question.id, correct.id) for question, correct, _ in self.questions]
+        get_answer_key(self.quiz)
+        query_counts = []
+        for batch in (selections[:1], selections):
+            AnsweredQuestion.objects.all().delete()
+            rebuild_quiz_counters(self.quiz)
+            with CaptureQueriesContext(connection) as queries:
+                record_answers(self.user_progress, batch)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_progress_is_locked_before_reading_recorded_answers(self):
+        question, correct, _ = self.questions[0]
+
+        with mock.patch("quiz.answers.lock_progress", wraps=lock_progress) as lock:
+            with CaptureQueriesContext(connection) as queries:
+                record_answers(self.user_progress, [(question.id, correct.id)])
+
+        lock.assert_called_once_with(self.user_progress.id)
+        selects = [query["sql"] for query in queries.captured_queries if query["sql"].startswith("SELECT")]
+        # SQLite ignores FOR UPDATE, the progress is still the first row read
+        self.assertIn('FROM "quiz_userquizprogress"', selects[0])
+
+    def test_quiz_must_be_published(self):
+        question, correct, _ = self.questions[0]
+        self.quiz.status = QuizStatus.objects.create(name="Draft", description="Quiz is a draft")
+        self.quiz.save()
+
+        response = self.post([{"question_id": question.id, "answer_id": correct.id}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Quiz is not published.")
+        self.assertEqual(AnsweredQuestion.objects.count(), 0)
+
+    def test_invalid_batches(self):
+        question, correct, _ = self.questions[0]
+
+        self.assertEqual(self.post([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post([{"question_id": question.id}]).status_code, status.HTTP_400_BAD_REQUEST)
+        too_many = [{"question_id": question.id, "answer_id": correct.id}] * 101
+        self.assertEqual(self.post(too_many).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(AnsweredQuestion.objects.count(), 0)
+
+
+@override_settings(QUIZ_ANSWER_WRITE_BEHIND=True)
+class WriteBehindTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        self.participant = User.objects.create_user(username="participant", password="password123")
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.creator, status=self.quiz_status)
+
+        self.question1 = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        self.answer1 = Answer.objects.create(question=self.question1, answer="Paris", is_correct=True)
+        self.answer2 = Answer.objects.create(question=self.question1, answer="Lyon", is_correct=False)
+        self.question2 = Question.objects.create(quiz=self.quiz, question="What is 2 + 2?")
+        self.answer3 = Answer.objects.create(question=self.question2, answer="4", is_correct=True)
+
+        AssignedQuiz.objects.create(user=self.participant, quiz=self.quiz)
+        self.client = APIClient()
+        self.client.login(username="participant", password="password123")
+        self.client.post(reverse("set_accepted_status"), {"quiz_id": self.quiz.id, "accepted": True}, format="json")
+        self.user_progress = UserQuizProgress.objects.get(user=self.participant, quiz=self.quiz)
+
+    def answer(self, question, answer):
+        data = {"question_id": question.id, "answer_id": answer.id}
+        return self.client.post(reverse("create_answered_question"), data, format="json")
+
+    def progress(self):
+        return self.client.get(reverse("get_participant_quiz_progress"), {"quiz_id": self.quiz.id}).data
+
+    def test_pending_answers_are_visible_and_flushed(self):
+        response = self.answer(self.question1, self.answer1)
+        self.answer(self.question1, self.answer1)
+        self.answer(self.question1, self.answer2)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(AnsweredQuestion.objects.count(), 0)
+        pending_progress = self.progress()
+        self.assertEqual(pending_progress["questions_answered"], 1)
+        next_question = self.client.get(reverse("get_next_question"), {"quiz_id": self.quiz.id})
+        self.assertEqual(next_question.data["id"], self.question2.id)
+
+        call_command("flush_pending_answers", "--once", stdout=StringIO())
+
+        self.assertEqual(PendingAnswer.objects.count(), 0)
+        self.assertEqual(AnsweredQuestion.objects.count(), 2)
+        self.assertEqual(self.progress(), pending_progress)
+        self.assertEqual(check_quiz_counters(self.quiz), [])
+        self.user_progress.refresh_from_db()
+        self.assertEqual(self.user_progress.cursor, self.question1.position)
+
+    def test_flush_in_batches(self):
+        for question, answer in [(self.question1, self.answer1), (self.question2, self.answer3)]:
+            self.answer(question, answer)
+
+        call_command("flush_pending_answers", "--once", "--batch-size", "1", stdout=StringIO())
+
+        self.assertEqual(PendingAnswer.objects.count(), 0)
+        self.assertEqual(self.progress()["completed"], True)
+        self.assertEqual(check_quiz_counters(self.quiz), [])
+
+
+class GetQuizSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.user, status=self.quiz_status)
+        self.question1 = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        self.answer1 = Answer.objects.create(question=self.question1, answer="Paris", is_correct=True)
+        self.answer2 = Answer.objects.create(question=self.question1, answer="Lyon", is_correct=False)
+        self.question2 = Question.objects.create(quiz=self.quiz, question="What is 2 + 2?")
+        self.answer3 = Answer.objects.create(question=self.question2, answer="4", is_correct=True)
+        AssignedQuiz.objects.create(user=self.user, quiz=self.quiz)
+
+        # Quiz IDs are reused between tests, so snapshots of earlier tests must not be found
+        snapshots.delete(self.quiz.id)
+        self.url = reverse("get_quiz_snapshot")
+
+    def test_snapshot_content(self):
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content),
+            {
+                "id": self.quiz.id,
+                "title": "Sample Quiz",
+                "description": None,
+                "questions": [
+                    {
+                        "id": self.question1.id,
+                        "question": "What is the capital of France?",
+                        "position": 1,
+                        "answers": [
+                            {"id": self.answer1.id, "answer": "Paris"},
+                            {"id": self.answer2.id, "answer": "Lyon"},
+                        ],
+                    },
+                    {
+                        "id": self.question2.id,
+                        "question": "What is 2 + 2?",
+                        "position": 2,
+                        "answers": [{"id": self.answer3.id, "answer": "4"}],
+                    },
+                ],
+            },
+        )
+
+    def test_repeat_fetch_is_not_modified(self):
+        etag = self.client.get(self.url, {"quiz_id": self.quiz.id})["ETag"]
+
+        # two queries for the session and the user, one for the assignment, none for the content
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"quiz_id": self.quiz.id}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_snapshot_requires_published_assigned_quiz(self):
+        other_quiz = Quiz.objects.create(title="Other Quiz", created_by=self.user, status=self.quiz_status)
+        response = self.client.get(self.url, {"quiz_id": other_quiz.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.quiz.status = QuizStatus.objects.create(name="Draft", description="Quiz is in draft state")
+        self.quiz.save()
+        response = self.client.get(self.url, {"quiz_id": self.quiz.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        UserProfile.objects.create(user=self.user, role=self.creator_role)
+        self.client = APIClient()
+        self.client.login(username="testuser", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.user, status=self.quiz_status)
+        self.question = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        Answer.objects.create(question=self.question, answer="Paris", is_correct=True)
+        self.assigned_quiz = AssignedQuiz.objects.create(user=self.user, quiz=self.quiz)
+        UserQuizProgress.objects.create(user=self.user, quiz=self.quiz)
+
+    def assert_revalidates(self, url, params, change):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        change()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_questions_by_quiz(self):
+        self.assert_revalidates(
+            reverse("get_questions_by_quiz"),
+            {"quiz_id": self.quiz.id},
+            lambda: Question.objects.create(quiz=self.quiz, question="What is 2 + 2?"),
+        )
+
+    def test_answers_by_question(self):
+        self.assert_revalidates(
+            reverse("get_answers_by_question"),
+            {"question_id": self.question.id},
+            lambda: Answer.objects.filter(question=self.question).delete(),
+        )
+
+    def test_user_quizzes(self):
+        self.assert_revalidates(
+            reverse("get_user_quizzes"),
+            {},
+            lambda: Quiz.objects.create(title="Other Quiz", created_by=self.user, status=self.quiz_status),
+        )
+
+    def test_assigned_quizzes(self):
+        def accept():
+            self.assigned_quiz.accepted = True
+            self.assigned_quiz.save()
+
+        self.assert_revalidates(reverse("get_assigned_quizzes"), {}, accept)
+
+    def test_deleting_the_latest_row_is_not_hidden_by_if_modified_since(self):
+        Question.objects.create(quiz=self.quiz, question="What is 2 + 2?")
+        url, params = reverse("get_questions_by_quiz"), {"quiz_id": self.quiz.id}
+        response = self.client.get(url, params)
+        self.assertNotIn("Last-Modified", response)
+
+        Question.objects.filter(quiz=self.quiz).order_by("-updated_at").first().delete()
+        response = self.client.get(url, params, HTTP_IF_MODIFIED_SINCE=http_date(timezone.now().timestamp() + 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_not_modified_skips_the_view(self):
+        etag = self.client.get(reverse("get_user_quizzes"))["ETag"]
+
+        with mock.patch("quiz.views.QuizSerializer") as serializer:
+            response = self.client.get(reverse("get_user_quizzes"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        serializer.assert_not_called()
+
+
+class LiveScoreboardTests(TestCase):
+    def setUp(self):
+        creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        UserProfile.objects.create(user=self.creator, role=creator_role)
+        self.participant = User.objects.create_user(username="participant", password="password123")
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.creator, status=self.quiz_status)
+        question = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        self.answer = Answer.objects.create(question=question, answer="Paris", is_correct=True)
+        Answer.objects.create(question=question, answer="Lyon", is_correct=False)
+        self.question = Question.objects.select_related("quiz__status").get(id=question.id)
+        self.user_progress = UserQuizProgress.objects.create(user=self.participant, quiz=self.quiz)
+
+    def record(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_answer(self.user_progress, self.question, self.answer)
+
+    def parse(self, event):
+        name, data = (event.decode() if isinstance(event, bytes) else event).strip().split("\n")
+        return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    async def test_local_broker_fans_out_events(self):
+        broker = LocalBroker(maxsize=2)
+        first = broker.subscribe("channel")
+        second = broker.subscribe("channel")
+
+        # events published from another thread wake up the waiting subscribers
+        waiting = asyncio.ensure_future(first.get(1))
+        await asyncio.sleep(0)
+        publisher = threading.Thread(target=broker.publish, args=("channel", {"n": 1}))
+        publisher.start()
+        self.assertEqual(await waiting, {"n": 1})
+        self.assertEqual(await second.get(1), {"n": 1})
+        self.assertIsNone(await first.get(0.01))
+        publisher.join()
+
+        # a subscriber that falls behind is told to start over
+        for n in range(3):
+            broker.publish("channel", {"n": n})
+        self.assertIs(await first.get(1), RESET)
+
+        first.close()
+        second.close()
+        self.assertFalse(broker.has_subscribers("channel"))
+
+    async def test_cache_broker_relays_events(self):
+        broker = CacheBroker(poll_interval=0.01)
+        channel = f"test:{self.quiz.id}:{id(broker)}"
+        self.assertFalse(broker.has_subscribers(channel))
+        subscription = broker.subscribe(channel)
+        self.assertTrue(broker.has_subscribers(channel))
+
+        broker.publish(channel, {"n": 1})
+        broker.publish(channel, {"n": 2})
+
+        self.assertEqual(await subscription.get(1), {"n": 1})
+        self.assertEqual(await subscription.get(1), {"n": 2})
+        self.assertIsNone(await subscription.get(0.05))
+
+    async def test_stream_pushes_score_changes(self):
+        events = iter_score_events(self.quiz, heartbeat=0.05)
+
+        scores = await sync_to_async(stored_quiz_scores)(self.quiz)
+        self.assertEqual(self.parse(await anext(events)), ("scores", scores))
+        self.assertEqual(await anext(events), ": keep-alive\n\n")
+
+        await sync_to_async(self.record)()
+        name, score = self.parse(await anext(events))
+        self.assertEqual(name, "score")
+        self.assertEqual(score["user"], "participant")
+        self.assertEqual(score["correct_answers"], 2)
+        self.assertTrue(score["completed"])
+
+        await events.aclose()
+        self.assertFalse(get_broker().has_subscribers(quiz_channel(self.quiz.id)))
+
+    def test_scores_are_only_read_for_watched_quizzes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record_answer(self.user_progress, self.question, self.answer)
+
+        # the move in the score histogram, then the publication of the score
+        self.assertEqual(len(callbacks), 2)
+        with self.assertNumQueries(0):
+            callbacks[1]()
+
+    async def test_stream_quiz_scores(self):
+        client = AsyncClient()
+        await client.aforce_login(self.creator)
+        response = await client.get(reverse("stream_quiz_scores"), {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+        name, scores = self.parse(await anext(events))
+        self.assertEqual(name, "scores")
+        self.assertEqual(scores[0]["user"], "participant")
+        await events.aclose()
+
+    def test_stream_quiz_scores_is_refused_under_wsgi(self):
+        client = APIClient()
+        client.force_authenticate(user=self.creator)
+
+        response = client.get(reverse("stream_quiz_scores"), {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+        self.assertFalse(response.streaming)
+        self.assertFalse(get_broker().has_subscribers(quiz_channel(self.quiz.id)))
+
+    def test_stream_quiz_scores_of_another_creator(self):
+        other = User.objects.create_user(username="other", password="password123")
+        UserProfile.objects.create(user=other, role=Role.objects.get(name="Creator"))
+        client = APIClient()
+        client.login(username="other", password="password123")
+
+        response = client.get(reverse("stream_quiz_scores"), {"quiz_id": self.quiz.id})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        buckets.clear()
+        question_quizzes.clear()
+        creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        UserProfile.objects.create(user=self.creator, role=creator_role)
+        self.participants = [User.objects.create_user(username=f"participant{n}") for n in range(3)]
+
+        self.quiz_status = QuizStatus.objects.create(name="Published", description="Quiz is published")
+        self.quiz = Quiz.objects.create(title="Sample Quiz", created_by=self.creator, status=self.quiz_status)
+        self.question = Question.objects.create(quiz=self.quiz, question="What is the capital of France?")
+        self.answer = Answer.objects.create(question=self.question, answer="Paris", is_correct=True)
+        for participant in self.participants:
+            UserQuizProgress.objects.create(user=participant, quiz=self.quiz)
+
+    def tearDown(self):
+        buckets.clear()
+
+    def get_next_question(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.get(reverse("get_next_question"), {"quiz_id": self.quiz.id})
+
+    def test_token_buckets_refill(self):
+        token_buckets = TokenBuckets(capacity=2, rate=0.5)
+        with mock.patch("quiz.throttling.time.monotonic", return_value=100.0) as monotonic:
+            self.assertEqual(token_buckets.take("key"), 0)
+            self.assertEqual(token_buckets.take("key"), 0)
+            self.assertEqual(token_buckets.take("key"), 2.0)
+            self.assertEqual(token_buckets.take("other"), 0)
+
+            monotonic.return_value = 101.0
+            self.assertEqual(token_buckets.take("key"), 1.0)
+            monotonic.return_value = 103.0
+            self.assertEqual(token_buckets.take("key"), 0)
+
+        self.assertEqual(token_buckets.stats()["allowed"], 4)
+        self.assertEqual(token_buckets.stats()["rejected"], 2)
+
+    @override_settings(QUIZ_THROTTLE_RATES={"user": (2, 0.5), "quiz": None})
+    def test_user_is_throttled_before_any_query(self):
+        participant = self.participants[0]
+        self.assertEqual(self.get_next_question(participant).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_next_question(participant).status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.get_next_question(participant)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "2")
+
+        # the other participants have their own buckets
+        self.assertEqual(self.get_next_question(self.participants[1]).status_code, status.HTTP_200_OK)
+
+    @override_settings(QUIZ_THROTTLE_RATES={"user": None, "quiz": (2, 0.5)})
+    def test_quiz_is_throttled(self):
+        self.assertEqual(self.get_next_question(self.participants[0]).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_next_question(self.participants[1]).status_code, status.HTTP_200_OK)
+        response = self.get_next_question(self.participants[2])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(QUIZ_THROTTLE_RATES={"user": None, "quiz": (2, 0.5)})
+    def test_single_answers_are_throttled_by_the_quiz_of_their_question(self):
+        data = {"question_id": self.question.id, "answer_id": self.answer.id}
+        for participant in self.participants[:2]:
+            client = APIClient()
+            client.force_authenticate(user=participant)
+            self.assertEqual(
+                client.post(reverse("create_answered_question"), data, format="json").status_code,
+                status.HTTP_201_CREATED,
+            )
+
+        # the quiz of the question is cached, the request is rejected before any query
+        client = APIClient()
+        client.force_authenticate(user=self.participants[2])
+        with self.assertNumQueries(0):
+            response = client.post(reverse("create_answered_question"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(QUIZ_THROTTLE_RATES={"user": (1, 0.5), "quiz": None})
+    def test_get_runtime_stats(self):
+        self.get_next_question(self.participants[0])
+        self.get_next_question(self.participants[0])
+
+        client = APIClient()
+        client.login(username="creator", password="password123")
+        response = client.get(reverse("get_runtime_stats"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["throttles"]["user"]["allowed"], 1)
+        self.assertEqual(response.data["throttles"]["user"]["rejected"], 1)
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.participant_role = Role.objects.create(name="Participant", description="Can take quizzes", level=2)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.user_profile = UserProfile.objects.create(user=self.user, role=self.creator_role)
+
+    def test_role_is_read_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user_role(self.user.id), "Creator")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_role(self.user.id), "Creator")
+
+    def test_role_check_costs_no_query_once_cached(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        first = client.get(reverse("get_runtime_stats"))
+
+        with self.assertNumQueries(0):
+            second = client.get(reverse("get_runtime_stats"))
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        roles, cached_roles = first.data["caches"]["roles"], second.data["caches"]["roles"]
+        self.assertEqual(cached_roles["hits"] - roles["hits"], 1)
+        self.assertEqual(cached_roles["misses"], roles["misses"])
+
+    def test_profile_changes_invalidate_the_role(self):
+        get_user_role(self.user.id)
+        self.user_profile.role = self.participant_role
+        self.user_profile.save()
+        self.assertEqual(get_user_role(self.user.id), "Participant")
+
+        self.user_profile.delete()
+        self.assertIs(get_user_role(self.user.id), NO_PROFILE)
+
+        UserProfile.objects.create(user=self.user, role=self.creator_role)
+        self.assertEqual(get_user_role(self.user.id), "Creator")
+
+    def test_role_changes_invalidate_the_role(self):
+        get_user_role(self.user.id)
+        self.creator_role.name = "Author"
+        self.creator_role.save()
+        self.assertEqual(get_user_role(self.user.id), "Author")
+
+        self.creator_role.delete()
+        self.assertIsNone(get_user_role(self.user.id))
+
+    def test_new_user_does_not_inherit_a_cached_role(self):
+        role_cache.set(self.user.id + 1, "Creator")
+        other = User.objects.create_user(username="other", password="password123")
+        self.assertEqual(other.id, self.user.id + 1)
+        self.assertIs(get_user_role(other.id), NO_PROFILE)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        tokens.clear_local()
+        role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        UserProfile.objects.create(user=self.user, role=role)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = reverse("get_runtime_stats")
+
+    def test_token_is_looked_up_once(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        # neither the token nor the role are read again
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # other processes find the token in the Django cache
+        tokens.clear_local()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_only_the_user_id_and_role_are_cached(self):
+        self.client.get(self.url)
+
+        cached = tokens.get(token_cache_key(self.token.key))
+        self.assertEqual(cached, (self.user.id, "Creator"))
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cached))
+
+    def test_cached_role_is_used_by_other_processes(self):
+        self.client.get(self.url)
+        tokens.clear_local()
+        role_cache.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.wsgi_request.user.id, self.user.id)
+
+    def test_role_change_invalidates_the_token(self):
+        self.client.get(self.url)
+        profile = self.user.userprofile
+        profile.role = Role.objects.create(name="Participant", description="Can take quizzes", level=10)
+        profile.save()
+
+        self.assertIsNone(tokens.get(token_cache_key(self.token.key)))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deleted_token_is_refused(self):
+        self.client.get(self.url)
+        self.token.delete()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_refused(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_is_refused(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(
+    QUIZ_ROLE_CAPABILITIES={
+        "Admin": ["view_users"],
+        "Creator": ["create_quiz", "view_scores"],
+        "Reviewer": ["view_scores"],
+    }
+)
+class RoleCapabilityTests(TestCase):
+    def setUp(self):
+        self.roles = {
+            name: Role.objects.create(name=name, description=f"{name} role", level=level)
+            for name, level in [("Admin", 0), ("Creator", 1), ("Reviewer", 5), ("Participant", 10)]
+        }
+        invalidate_roles()
+
+    def tearDown(self):
+        invalidate_roles()
+
+    def user_with_role(self, name):
+        user = User.objects.create_user(username=name.lower(), password="password123")
+        UserProfile.objects.create(user=user, role=self.roles[name])
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_roles_inherit_the_capabilities_of_lower_roles(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_role_capabilities("Admin"),
+                Capability.VIEW_USERS | Capability.CREATE_QUIZ | Capability.VIEW_SCORES,
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(get_role_capabilities("Creator"), Capability.CREATE_QUIZ | Capability.VIEW_SCORES)
+            self.assertEqual(get_role_capabilities("Reviewer"), Capability.VIEW_SCORES)
+            self.assertEqual(get_role_capabilities("Participant"), Capability(0))
+            self.assertEqual(get_role_capabilities(None), Capability(0))
+
+    def test_role_changes_recompile_the_capabilities(self):
+        get_role_capabilities("Reviewer")
+        self.roles["Reviewer"].level = 0
+        self.roles["Reviewer"].save()
+
+        self.assertEqual(get_role_capabilities("Reviewer"), Capability.CREATE_QUIZ | Capability.VIEW_SCORES)
+
+    def test_views_require_capabilities(self):
+        # the admin creates quizzes through the hierarchy, the reviewer does not
+        self.assertEqual(self.user_with_role("Admin").get(reverse("get_user_quizzes")).status_code, status.HTTP_200_OK)
+        response = self.user_with_role("Reviewer").get(reverse("get_user_quizzes"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.user_with_role("Participant").get(reverse("get_user_quizzes"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(QUIZ_ROLE_CAPABILITIES={"Creator": ["create_quizzes"]})
+    def test_unknown_capability(self):
+        invalidate_roles()
+        with self.assertRaises(ImproperlyConfigured):
+            get_role_capabilities("Creator")
+
+
+class ImportUsersTests(TestCase):
+    def setUp(self):
+        self.creator_role = Role.objects.create(name="Creator", description="Can manage quizzes", level=1)
+        self.participant_role = Role.objects.create(name="Participant", description="Can take quizzes", level=2)
+        self.creator = User.objects.create_user(username="creator", password="password123")
+        UserProfile.objects.create(user=self.creator, role=self.creator_role)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.creator)
+
+        # the uploaded files wait for their job in the media directory
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.media = media.name
+
+    def run_jobs(self):
+        call_command("run_jobs", "--once", "--workers", "0", stdout=StringIO())
+
+    def test_import_users(self):
+        lines = [
+            "username,password,email,role",
+            "alice,secret-alice,alice@example.com,Participant",
+            "bob,,bob@example.com,Creator",
+            "alice,secret,alice2@example.com,Participant",
+            "creator,secret,,Participant",
+            "carol,secret,not-an-email,Participant",
+            "dave,secret,,Admin",
+            ",secret,,Participant",
+        ]
+
+        result = import_users(iter_csv_rows(lines), batch_size=3)
+
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(
+            [(rejected["row"], rejected["error"]) for rejected in result["rejected"]],
+            [
+                (3, "Username already exists."),
+                (4, "Username already exists."),
+                (5, "Email is not valid."),
+                (6, "Role does not exist."),
+                (7, "Username is required."),
+            ],
+        )
+        alice = User.objects.select_related("userprofile__role").get(username="alice")
+        self.assertTrue(alice.check_password("secret-alice"))
+        self.assertEqual(alice.userprofile.role, self.participant_role)
+        # users without a password set theirs through a password reset
+        bob = User.objects.get(username="bob")
+        self.assertFalse(bob.has_usable_password())
+        self.assertEqual(bob.userprofile.role, self.creator_role)
+
+    def test_import_users_in_batches_with_few_queries(self):
+        lines = ["username,email,role"] + [f"student{n},student{n}@example.com,Participant" for n in range(10)]
+
+        # the roles once, then for each of the two batches the taken usernames, and the users and the profiles
+        # inserted in a transaction, a savepoint in the test
+        with self.assertNumQueries(1 + 2 * (1 + 2 + 2)):
+            result = import_users(iter_csv_rows(lines), batch_size=5)
+
+        self.assertEqual(result, {"created": 10, "rejected": []})
+        self.assertEqual(UserProfile.objects.filter(role=self.participant_role).count(), 10)
+
+    def test_jsonl_rows(self):
+        lines = ['{"username": "alice", "password": 1234, "role": "Participant"}', "", "[1, 2]", "not json"]
+        self.assertEqual(
+            list(iter_jsonl_rows(lines)), [{"username": "alice", "password": "1234", "role": "Participant"}, None, None]
+        )
+
+    @mock.patch("quiz.provisioning.POOL_THRESHOLD", 1)
+    def test_passwords_are_hashed_in_worker_processes(self):
+        lines = ["username,password,role", "alice,secret-alice,Participant", "bob,secret-bob,Participant"]
+
+        result = import_users(iter_csv_rows(lines), workers=2)
+
+        self.assertEqual(result["created"], 2)
+        self.assertTrue(User.objects.get(username="bob").check_password("secret-bob"))
+
+    def test_import_users_endpoint(self):
+        upload = SimpleUploadedFile(
+            "users.jsonl", b'{"username": "alice", "password": "secret", "role": "Participant"}\n'
+        )
+        # no password is hashed in the request, the import is queued
+        with mock.patch("quiz.provisioning.make_password") as make_password:
+            response = self.client.post(reverse("import_users"), {"file": upload}, format="multipart")
+        make_password.assert_not_called()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["kind"], "import_users")
+        self.assertFalse(User.objects.filter(username="alice").exists())
+
+        self.run_jobs()
+
+        response = self.client.get(reverse("get_job_result"), {"job_id": response.data["id"]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"created": 1, "rejected": []})
+        self.assertTrue(User.objects.get(username="alice").check_password("secret"))
+        # the file with the passwords is deleted once imported
+        self.assertEqual(os.listdir(os.path.join(self.media, "imports")), [])
+
+    @override_settings(QUIZ_IMPORT_USERS_BATCH_SIZE=1)
+    def test_import_users_endpoint_reports_the_users_imported_before_a_decoding_error(self):
+        upload = SimpleUploadedFile(
+            "users.csv", b"username,role\nalice,Participant\nbob,Participant\n\xff,Participant\n"
+        )
+        response = self.client.post(reverse("import_users"), {"file": upload}, format="multipart")
+
+        self.run_jobs()
+
+        response = self.client.get(reverse("get_job_result"), {"job_id": response.data["id"]})
+        self.assertEqual(
+            response.data,
+            {
+                "created": 2,
+                "rejected": [],
+                "error": "File must be UTF-8 encoded, the rows from 3 on were not imported.",
+            },
+        )
+        self.assertTrue(User.objects.filter(username="bob").exists())
+
+    def test_import_users_endpoint_rejects_unknown_formats(self):
+        upload = SimpleUploadedFile("users.xlsx", b"username")
+        response = self.client.post(reverse("import_users"), {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_users_endpoint_requires_capability(self):
+        participant = User.objects.create_user(username="participant", password="password123")
+        UserProfile.objects.create(user=participant, role=self.participant_role)
+        client = APIClient()
+        client.force_authenticate(user=participant)
+
+        upload = SimpleUploadedFile("users.csv", b"username,role\nalice,Participant\n")
+        response = client.post(reverse("import_users"), {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(User.objects.filter(username="alice").exists())
+
+    def test_import_users_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "users.csv")
+            with open(path, "w", newline="") as users:
+                users.write("username,password,email,role\nalice,secret,,Participant\nbob,secret,,Nope\n")
+            stdout = StringIO()
+            call_command("import_users", path, "--workers", "0", stdout=stdout)
+
+        self.assertIn("Row 2 (bob): Role does not exist.", stdout.getvalue())
+        self.assertIn("Imported 1 users", stdout.getvalue())
+        self.assertTrue(User.objects.get(username="alice").check_password("secret"))
@@ -0,0 +1,222 @@
+"""
+This module contains the request throttling of the quiz endpoints.
+
+Every participant and every quiz has a token bucket in the memory of the process. A request takes one token from the
+bucket of its user and one from the bucket of its quiz, and buckets refill at a constant rate up to their capacity, so
+clients can burst briefly but not sustain more than the refill rate. A request finding an empty bucket is rejected by
+DRF with 429 and a Retry-After header, before the view runs any query. The capacities and refill rates are set with
+``QUIZ_THROTTLE_RATES``, and the buckets count the requests they allowed and rejected.
+
+The quiz of a request is its ``quiz_id``, or the quiz of its ``question_id`` for the requests answering a single
+question. The quizzes of questions are cached in process, so only the first answer to a question costs a query.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+import time
+
+from django.conf import settings
+
+from rest_framework.throttling import BaseThrottle
+
+from .cache import LocalCache
+
+from .models import Question
+
+
+# Burst capacity and tokens refilled per second of every scope, used when QUIZ_THROTTLE_RATES does not set them
+DEFAULT_THROTTLE_RATES = {
+    "user": (60, 20),
+    "quiz": (5000, 1000),
+}
+
+
+class TokenBuckets:
+    """
+    This class is a bounded set of token buckets with the same capacity and refill rate.
+
+    The least recently used buckets are dropped once there are ``maxsize`` of them, they are full again by the time
+    their client comes back anyway.
+    """
+
+    def __init__(self, capacity, rate, maxsize=10000):
+        self.capacity = capacity
+        self.rate = rate
+        self.maxsize = maxsize
+        self.allowed = 0
+        self.rejected = 0
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key):
+        """
+        This function takes one token from the bucket of a key.
+
+        Args:
+            key: The key of the bucket.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the number of seconds until the bucket has a token again.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                delay = 0
+                self.allowed += 1
+            else:
+                delay = (1 - tokens) / self.rate
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return delay
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self.allowed = 0
+            self.rejected = 0
+
+    def stats(self):
+        """
+        This function returns the counters of the buckets.
+
+        Returns:
+            dict: The number of allowed and rejected requests, the rejection rate and the number of buckets.
+        """
+        requests = self.allowed + self.rejected
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "reject_rate": self.rejected / requests if requests else 0.0,
+            "buckets": len(self._buckets),
+        }
+
+
+buckets = {}
+buckets_lock = Lock()
+
+# question id -> quiz id, a question moved to another quiz is throttled with its old quiz until it is dropped
+question_quizzes = LocalCache(maxsize=getattr(settings, "QUIZ_QUESTION_QUIZ_CACHE_SIZE", 16384))
+
+
+def get_question_quiz(question_id):
+    """
+    This function returns the ID of the quiz of a question, usually from the cache.
+
+    Args:
+        question_id: The ID of the question, as sent by the client.
+
+    Returns:
+        int: The ID of the quiz, or None if the question does not exist.
+    """
+    try:
+        question_id = int(question_id)
+    except (TypeError, ValueError):
+        return None
+    quiz_id = question_quizzes.get(question_id)
+    if quiz_id is None:
+        quiz_id = Question.objects.filter(id=question_id).values_list("quiz_id", flat=True).first()
+        if quiz_id is not None:
+            question_quizzes.set(question_id, quiz_id)
+    return quiz_id
+
+
+def get_buckets(scope):
+    """
+    This function returns the token buckets of a scope, creating them from the settings on first use.
+
+    Args:
+        scope (str): The scope of the buckets, ``user`` or ``quiz``.
+
+    Returns:
+        TokenBuckets: The buckets of the scope, or None if the scope is not throttled.
+    """
+    rates = {**DEFAULT_THROTTLE_RATES, **getattr(settings, "QUIZ_THROTTLE_RATES", {})}
+    rate = rates.get(scope)
+    if rate is None:
+        return None
+    with buckets_lock:
+        scope_buckets = buckets.get(scope)
+        if scope_buckets is None or (scope_buckets.capacity, scope_buckets.rate) != tuple(rate):
+            scope_buckets = buckets[scope] = TokenBuckets(*rate)
+    return scope_buckets
+
+
+def throttle_stats():
+    """
+    This function returns the counters of the token buckets of all scopes.
+
+    Returns:
+        dict: The counters of every scope.
+    """
+    return {scope: scope_buckets.stats() for scope, scope_buckets in buckets.items()}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    This class throttles requests with the token buckets of a scope, one bucket per user by default.
+    """
+
+    scope = None
+
+    def get_key(self, request, view):
+        """
+        This function returns the key of the bucket of a request.
+
+        Args:
+            request (Request): The request.
+            view (APIView): The view.
+
+        Returns:
+            The key of the bucket, or None if the request is not throttled: the ID of the user, or the client address
+            for anonymous requests.
+        """
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        self.delay = 0
+        scope_buckets = get_buckets(self.scope)
+        if scope_buckets is None:
+            return True
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        self.delay = scope_buckets.take(key)
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    This class throttles the requests of every user, or of every client address for anonymous requests.
+    """
+
+    scope = "user"
+
+
+class QuizTokenBucketThrottle(TokenBucketThrottle):
+    """
+    This class throttles the requests of every quiz, for the endpoints that receive a ``quiz_id`` or a ``question_id``.
+    """
+
+    scope = "quiz"
+
+    def get_key(self, request, view):
+        quiz_id = request.query_params.get("quiz_id")
+        if quiz_id is None and isinstance(request.data, dict):
+            quiz_id = request.data.get("quiz_id")
+            if quiz_id is None and "question_id" in request.data:
+                quiz_id = get_question_quiz(request.data["question_id"])
+        return str(quiz_id) if quiz_id is not None else None
+
+
+# The throttles of the endpoints participants call in a loop during a live quiz
+QUIZ_THROTTLES = [UserTokenBucketThrottle, QuizTokenBucketThrottle]
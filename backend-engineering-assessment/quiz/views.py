@@ -4,6 +4,11 @@ This module contains the views for the quiz app.
 Written by: Moritz Patek | patekmoritz@yahoo.at
 """
 
+import os
+
+from rest_framework.decorators import throttle_classes
+from rest_framework.decorators import parser_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.decorators import api_view
 
 from drf_yasg.utils import swagger_auto_schema
@@ -11,20 +16,83 @@ from drf_yasg import openapi
 
 from rest_framework.response import Response
 
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotModified
+from django.http import StreamingHttpResponse
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from django.db import transaction
+
 from rest_framework import status
 
 from .serializers import AnsweredQuestionSerializer
 from .serializers import AssignedQuizSerializer
 from .serializers import QuizStatusSerializer
+from .serializers import NextQuestionSerializer
+from .serializers import QuizSnapshotSerializer
 from .serializers import QuestionSerializer
 from .serializers import AnswerSerializer
 from .serializers import UserSerializer
 from .serializers import QuizSerializer
 from .serializers import RoleSerializer
+from .serializers import JobSerializer
+
+from .decorators import conditional_response
+from .decorators import content_version
+from .decorators import capability_required
+from .decorators import conditional
+
+from .scoring import stored_progress_score
+from .scoring import stored_quiz_scores
+from .scoring import get_quiz_totals
+
+from .answers import MAX_BATCH_SIZE
+from .answers import record_answers
+from .answers import resolve_submission
+from .answers import record_answer
+
+from .progress import find_next_question
+
+from .snapshots import get_snapshot
+from .snapshots import snapshots
+
+from .buffer import buffered_progress_score
+from .buffer import write_behind_enabled
+from .buffer import buffer_answer
+
+from .answer_key import invalidate_answer_key
+from .answer_key import answer_keys
+
+from .exports import iter_quiz_scores
+from .exports import EXPORT_FORMATS
+
+from .leaderboard import get_leaderboard_page
 
-from .decorators import role_required
+from .directory import get_users_page
+
+from .live import iter_score_events
+
+from .histogram import get_score_rank
+from .histogram import remove_score
+from .histogram import add_score
+
+from .analytics import get_item_analysis
+from .analytics import item_analyses
+
+from .jobs import enqueue_user_import
+from .jobs import enqueue_job
+
+from .provisioning import IMPORT_FORMATS
+
+from .throttling import question_quizzes
+from .throttling import QUIZ_THROTTLES
+from .throttling import throttle_stats
+
+from .roles import role_cache
+from .roles import Capability
+
+from .authentication import tokens
 
-from .models import AnsweredQuestion
 from .models import UserQuizProgress
 from .models import AssignedQuiz
 from .models import QuizStatus
@@ -33,6 +101,7 @@ from .models import Answer
 from .models import Quiz
 from .models import User
 from .models import Role
+from .models import Job
 
 
 @swagger_auto_schema(method="post", request_body=UserSerializer)
@@ -51,9 +120,49 @@ def create_user(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@swagger_auto_schema(
+    method="post",
+    manual_parameters=[
+        openapi.Parameter(
+            "file", openapi.IN_FORM, description="CSV or JSONL file of users", type=openapi.TYPE_FILE, required=True
+        ),
+        openapi.Parameter(
+            "file_format",
+            openapi.IN_FORM,
+            description="Format, csv or jsonl, by default from the file name",
+            type=openapi.TYPE_STRING,
+        ),
+    ],
+    responses={202: JobSerializer},
+)
+@api_view(["POST"])
+@parser_classes([MultiPartParser])
+@capability_required(Capability.CREATE_USERS)
+def import_users(request):
+    """
+    This view queues the import of the users of an uploaded CSV or JSONL file, with their roles.
+
+    Returns:
+        Response: The response containing the queued job, whose result holds the number of created users and the
+            rejected rows.
+    """
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response({"error": "A file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    file_format = request.data.get("file_format") or os.path.splitext(upload.name)[1].lstrip(".").lower()
+    if file_format not in IMPORT_FORMATS:
+        return Response({"error": "Format must be csv or jsonl."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # hashing the passwords takes a fraction of a second each, the import runs in the workers of run_jobs
+    job = enqueue_user_import(upload, file_format, request.user)
+    serializer = JobSerializer(job)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
 @swagger_auto_schema(method="post", request_body=QuizSerializer)
 @api_view(["POST"])
-@role_required("Creator")
+@capability_required(Capability.CREATE_QUIZ)
 def create_quiz(request):
     """
     This view creates a new quiz.
@@ -70,7 +179,7 @@ def create_quiz(request):
 
 @swagger_auto_schema(method="post", request_body=QuestionSerializer)
 @api_view(["POST"])
-@role_required("Creator")
+@capability_required(Capability.EDIT_QUIZ)
 def create_question(request):
     """
     This view creates a new question.
@@ -87,7 +196,7 @@ def create_question(request):
 
 @swagger_auto_schema(method="post", request_body=AnswerSerializer)
 @api_view(["POST"])
-@role_required("Creator")
+@capability_required(Capability.EDIT_QUIZ)
 def create_answer(request):
     """
     This view creates a new answer.
@@ -97,9 +206,9 @@ def create_answer(request):
     """
     # check if the quiz was made by the request user
     question_id = request.data.get("question_id")
-    question = Question.objects.get(id=question_id)
+    question = Question.objects.select_related("quiz").get(id=question_id)
     quiz = question.quiz
-    if quiz.created_by != request.user:
+    if quiz.created_by_id != request.user.id:
         return Response(
             {"error": "You do not have permission to perform this action."}, status=status.HTTP_403_FORBIDDEN
         )
@@ -122,6 +231,7 @@ def create_answer(request):
     responses={200: AnsweredQuestionSerializer},
 )
 @api_view(["POST"])
+@throttle_classes(QUIZ_THROTTLES)
 def create_answered_question(request):
     """
     This view creates a new answered question.
@@ -133,40 +243,98 @@ def create_answered_question(request):
     question_id = request.data.get("question_id")
     answer_id = request.data.get("answer_id")
 
-    try:
-        question = Question.objects.get(id=question_id)
-    except Question.DoesNotExist:
-        return Response({"error": "Question does not exist."}, status=status.HTTP_404_NOT_FOUND)
+    answer = resolve_submission(user, question_id, answer_id)
 
-    try:
-        answer = Answer.objects.get(id=answer_id)
-    except Answer.DoesNotExist:
-        return Response({"error": "Answer does not exist."}, status=status.HTTP_404_NOT_FOUND)
+    if not answer:
+        # only a rejected submission pays for finding out why
+        if not Question.objects.filter(id=question_id).exists():
+            return Response({"error": "Question does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        if not Answer.objects.filter(id=answer_id).exists():
+            return Response({"error": "Answer does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"error": "Answer does not belong to the question."}, status=status.HTTP_400_BAD_REQUEST)
 
+    question = answer.question
     quiz = question.quiz
-    user_progress = UserQuizProgress.objects.get(user=user, quiz=quiz)
 
-    if not user_progress:
+    if not answer.progress_id:
         return Response({"error": "User does not have access to the question."}, status=status.HTTP_403_FORBIDDEN)
 
-    # Check if the answer for this question has already been answered
-    answered_question = AnsweredQuestion.objects.filter(progress=user_progress, question=question, answer=answer)
-    if answered_question.exists():
-        # since multiple answers can be correct for one question, we don't want to raise an error but just return the
-        # answer that was already answered
-        user_progress.last_answered_question = question
-        user_progress.save()
-        serializer = AnsweredQuestionSerializer(answered_question.first())
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    else:
-        # Crate a new answered question
-        new_answered_question = AnsweredQuestion.objects.create(
-            progress=user_progress, question=question, answer=answer
+    # Check if quiz is Published
+    if quiz.status.name != "Published":
+        return Response({"error": "Quiz is not published."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # the progress is only written to, by ID, so it is not fetched
+    user_progress = UserQuizProgress(id=answer.progress_id, user=user, quiz=quiz)
+
+    if write_behind_enabled():
+        buffer_answer(user_progress, question, answer)
+        return Response(
+            {"question_id": question.id, "answer_id": answer.id, "status": "pending"}, status=status.HTTP_202_ACCEPTED
         )
-        user_progress.last_answered_question = question
-        user_progress.save()
-        serializer = AnsweredQuestionSerializer(new_answered_question)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    answered_question, created = record_answer(user_progress, question, answer)
+    serializer = AnsweredQuestionSerializer(answered_question)
+    return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method="post",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            "quiz_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID of the quiz"),
+            "answers": openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                description="Selected answers",
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "question_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID of the question"),
+                        "answer_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID of the answer"),
+                    },
+                ),
+            ),
+        },
+    ),
+)
+@api_view(["POST"])
+@throttle_classes(QUIZ_THROTTLES)
+def create_answered_questions(request):
+    """
+    This view records a batch of answers of the user in a quiz.
+
+    Returns:
+        Response: The response containing the result of every answer.
+    """
+    user = request.user
+    quiz_id = request.data.get("quiz_id")
+    answers = request.data.get("answers")
+
+    if not isinstance(answers, list) or not answers:
+        return Response({"error": "Answers must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(answers) > MAX_BATCH_SIZE:
+        return Response(
+            {"error": f"At most {MAX_BATCH_SIZE} answers can be sent at once."}, status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        selections = [(int(answer["question_id"]), int(answer["answer_id"])) for answer in answers]
+    except (TypeError, KeyError, ValueError):
+        return Response(
+            {"error": "Every answer must have a question_id and an answer_id."}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    user_progress = UserQuizProgress.objects.select_related("quiz__status").filter(user=user, quiz=quiz_id).first()
+
+    if not user_progress:
+        return Response({"error": "User does not have access to the quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+    # Check if quiz is Published
+    if user_progress.quiz.status.name != "Published":
+        return Response({"error": "Quiz is not published."}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = record_answers(user_progress, selections)
+    created = any(result["status"] == "created" for result in results)
+    return Response({"results": results}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
 @swagger_auto_schema(
@@ -180,7 +348,7 @@ def create_answered_question(request):
     ),
 )
 @api_view(["POST"])
-@role_required("Creator")
+@capability_required(Capability.ASSIGN_QUIZ)
 def set_quiz_to_user(request):
     """
     This view assigns a quiz to a user.
@@ -239,7 +407,7 @@ def set_accepted_status(request):
     accepted = request.data.get("accepted")
 
     try:
-        quiz = Quiz.objects.get(id=quiz_id)
+        quiz = Quiz.objects.select_related("status").get(id=quiz_id)
     except Quiz.DoesNotExist:
         return Response({"error": "Quiz does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -250,12 +418,19 @@ def set_accepted_status(request):
 
     if accepted:
         try:
-            UserQuizProgress.objects.create(user=request.user, quiz=quiz)
+            # participants start with the unselected wrong answers counted as correct
+            initial_score = get_quiz_totals(quiz)["incorrect_answers"]
+            with transaction.atomic():
+                UserQuizProgress.objects.create(user=request.user, quiz=quiz, score=initial_score)
+                add_score(quiz.id, initial_score)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     else:
         try:
-            UserQuizProgress.objects.get(user=request.user, quiz=quiz).delete()
+            with transaction.atomic():
+                user_progress = UserQuizProgress.objects.get(user=request.user, quiz=quiz)
+                user_progress.delete()
+                remove_score(quiz.id, user_progress.score)
         except UserQuizProgress.DoesNotExist:
             return Response({"error": "User has not started the quiz."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -276,7 +451,7 @@ def set_accepted_status(request):
     ),
 )
 @api_view(["POST"])
-@role_required("Creator")
+@capability_required(Capability.EDIT_QUIZ)
 def set_quiz_status(request):
     """
     This view updates the status of a quiz.
@@ -299,27 +474,29 @@ def set_quiz_status(request):
 
     if quiz_status.name == "Published":
         # Check if this quiz has questions that have no answers
-        questions = Question.objects.filter(quiz=quiz)
-        for question in questions:
-            if not Answer.objects.filter(question=question).exists():
-                question_ids = [q.id for q in questions if not Answer.objects.filter(question=q).exists()]
-                return Response(
-                    {
-                        "error": f"The Questions with IDs {question_ids} do not have answers. "
-                        "Please add answers to all questions before publishing the quiz."
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        question_ids = list(Question.objects.filter(quiz=quiz, answers__isnull=True).values_list("id", flat=True))
+        if question_ids:
+            return Response(
+                {
+                    "error": f"The Questions with IDs {question_ids} do not have answers. "
+                    "Please add answers to all questions before publishing the quiz."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
     quiz.status = quiz_status
     quiz.save()
 
+    # The answer key of a Published quiz is compiled once, here
+    invalidate_answer_key(quiz)
+
     return Response({"message": "Quiz status updated successfully."}, status=status.HTTP_200_OK)
 
 
 @swagger_auto_schema(method="get", responses={200: QuizSerializer(many=True)})
 @api_view(["GET"])
-@role_required("Creator")
+@capability_required(Capability.CREATE_QUIZ)
+@conditional(lambda request: content_version(Quiz.objects.filter(created_by=request.user)))
 def get_user_quizzes(request):
     """
     This view retrieves all quizzes created by the user.
@@ -335,6 +512,7 @@ def get_user_quizzes(request):
 
 @swagger_auto_schema(method="get", responses={200: AssignedQuizSerializer(many=True)})
 @api_view(["GET"])
+@conditional(lambda request: content_version(AssignedQuiz.objects.filter(user=request.user)))
 def get_assigned_quizzes(request):
     """
     This view retrieves all quizzes assigned to the user.
@@ -384,7 +562,8 @@ def get_available_user_roles(request):
     responses={200: QuestionSerializer(many=True)},
 )
 @api_view(["GET"])
-@role_required("Creator")
+@capability_required(Capability.EDIT_QUIZ)
+@conditional(lambda request: content_version(Question.objects.filter(quiz=request.query_params.get("quiz_id"))))
 def get_questions_by_quiz(request):
     """
     This view retrieves all questions for a specific quiz.
@@ -414,46 +593,14 @@ def get_participant_quiz_progress(request):
     """
     user = request.user
     quiz_id = request.query_params.get("quiz_id")  # Retrieve quiz_id from query parameters
-    quiz = Quiz.objects.get(id=quiz_id)
-    user_progress = UserQuizProgress.objects.get(user=user, quiz=quiz)
-    answered_questions = AnsweredQuestion.objects.filter(progress=user_progress)
-    total_questions = Question.objects.filter(quiz=quiz)
-
-    questions_answered_count = 0
-    questions_answered = []
-
-    correct_answers = 0
-    total_answers = 0
-
-    # Calculate the progress of the user
-    for question in total_questions:
-        answers = Answer.objects.filter(question=question)
-        for answer in answers:
-            total_answers += 1
-
-            if AnsweredQuestion.objects.filter(progress=user_progress, question=question, answer=answer).exists():
-                if answer.is_correct:
-                    correct_answers += 1
-            else:
-                if not answer.is_correct:
-                    # If there is no AnsweredQuestion for this question, and the answer is not correct,
-                    # then the user has answered the question correctly
-                    correct_answers += 1
-
-    # answered questions sometimes answer the same question multiple times, so we need to get the unique questions
-    for answered_question in answered_questions:
-        if answered_question.question not in questions_answered:
-            questions_answered.append(answered_question.question)
-            questions_answered_count += 1
-
-    progress = {
-        "quiz": quiz.title,
-        "completed": True if questions_answered_count == total_questions.count() else False,
-        "questions_answered": questions_answered_count,
-        "total_questions": total_questions.count(),
-        "correct_answers": correct_answers,
-        "total_answers": total_answers,
-    }
+    user_progress = UserQuizProgress.objects.select_related("quiz__status").get(user=user, quiz=quiz_id)
+
+    if write_behind_enabled():
+        score = buffered_progress_score(user_progress)
+    else:
+        score = stored_progress_score(user_progress)
+
+    progress = {"quiz": user_progress.quiz.title, **score}
     return Response(progress)
 
 
@@ -464,7 +611,33 @@ def get_participant_quiz_progress(request):
     ],
 )
 @api_view(["GET"])
-@role_required("Creator")
+def get_participant_quiz_rank(request):
+    """
+    This view retrieves the rank and percentile of a participant among all participants of a quiz.
+
+    Returns:
+        Response: The response containing the score, rank and percentile of the participant.
+    """
+    user = request.user
+    quiz_id = request.query_params.get("quiz_id")
+
+    try:
+        user_progress = UserQuizProgress.objects.select_related("quiz").get(user=user, quiz=quiz_id)
+    except UserQuizProgress.DoesNotExist:
+        return Response({"error": "User has not started the quiz."}, status=status.HTTP_404_NOT_FOUND)
+
+    rank = {"quiz": user_progress.quiz.title, **get_score_rank(user_progress.quiz, user_progress.score)}
+    return Response(rank)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("quiz_id", openapi.IN_QUERY, description="ID of the quiz", type=openapi.TYPE_INTEGER)
+    ],
+)
+@api_view(["GET"])
+@capability_required(Capability.VIEW_SCORES)
 def get_quiz_scores(request):
     """
     This view retrieves the scores of all participants in a quiz.
@@ -474,55 +647,166 @@ def get_quiz_scores(request):
     """
     user = request.user
     quiz_id = request.query_params.get("quiz_id")
-    quiz = Quiz.objects.get(id=quiz_id)
+    quiz = Quiz.objects.select_related("status").get(id=quiz_id)
+
+    if quiz.created_by_id != user.id:
+        return Response({"error": "You do not have permission to view this quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+    scores = stored_quiz_scores(quiz)
+    return Response(scores)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("quiz_id", openapi.IN_QUERY, description="ID of the quiz", type=openapi.TYPE_INTEGER)
+    ],
+)
+@api_view(["GET"])
+@capability_required(Capability.VIEW_SCORES)
+def stream_quiz_scores(request):
+    """
+    This view streams the live scoreboard of a quiz as Server-Sent Events.
+
+    The stream never ends, so it is only served over ASGI. A WSGI server would read all of it before sending anything.
+
+    Returns:
+        StreamingHttpResponse: The response streaming the scores of all participants, then every score change.
+    """
+    user = request.user
+    quiz_id = request.query_params.get("quiz_id")
 
-    scores = []
+    try:
+        quiz = Quiz.objects.select_related("status").get(id=quiz_id)
+    except Quiz.DoesNotExist:
+        return Response({"error": "Quiz does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
-    if quiz.created_by != user:
+    if quiz.created_by_id != user.id:
         return Response({"error": "You do not have permission to view this quiz."}, status=status.HTTP_403_FORBIDDEN)
 
-    user_progresses = UserQuizProgress.objects.filter(quiz=quiz)
-    for user_progress in user_progresses:
-        answered_questions = AnsweredQuestion.objects.filter(progress=user_progress)
-        total_questions = Question.objects.filter(quiz=quiz)
-
-        questions_answered_count = 0
-        questions_answered = []
-
-        correct_answers = 0
-        total_answers = 0
-
-        for question in total_questions:
-            answers = Answer.objects.filter(question=question)
-            for answer in answers:
-                total_answers += 1
-
-                if AnsweredQuestion.objects.filter(progress=user_progress, question=question, answer=answer).exists():
-                    if answer.is_correct:
-                        correct_answers += 1
-                else:
-                    if not answer.is_correct:
-                        # If there is no AnsweredQuestion for this question, and the answer is not correct,
-                        # then the user has answered the question correctly.
-                        correct_answers += 1
-
-        # answered questions sometimes answer the same question multiple times, so we need to get the unique questions
-        for answered_question in answered_questions:
-            if answered_question.question not in questions_answered:
-                questions_answered.append(answered_question.question)
-                questions_answered_count += 1
-
-        progress = {
-            "user": user_progress.user.username,
-            "completed": True if questions_answered_count == total_questions.count() else False,
-            "questions_answered": questions_answered_count,
-            "total_questions": total_questions.count(),
-            "correct_answers": correct_answers,
-            "total_answers": total_answers,
-        }
-        scores.append(progress)
+    if not isinstance(request._request, ASGIRequest):
+        return Response(
+            {"error": "Live scores are only available when the app is served over ASGI."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
 
-    return Response(scores)
+    response = StreamingHttpResponse(iter_score_events(quiz), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("quiz_id", openapi.IN_QUERY, description="ID of the quiz", type=openapi.TYPE_INTEGER)
+    ],
+)
+@api_view(["GET"])
+@capability_required(Capability.VIEW_SCORES)
+def get_quiz_item_analysis(request):
+    """
+    This view retrieves the difficulty, answer pick rates and discrimination of every question of a quiz.
+
+    Returns:
+        Response: The response containing the item analysis of the quiz.
+    """
+    user = request.user
+    quiz_id = request.query_params.get("quiz_id")
+
+    try:
+        quiz = Quiz.objects.select_related("status").get(id=quiz_id)
+    except Quiz.DoesNotExist:
+        return Response({"error": "Quiz does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    if quiz.created_by_id != user.id:
+        return Response({"error": "You do not have permission to view this quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response(get_item_analysis(quiz))
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("quiz_id", openapi.IN_QUERY, description="ID of the quiz", type=openapi.TYPE_INTEGER),
+        openapi.Parameter(
+            "cursor", openapi.IN_QUERY, description="Cursor returned with the previous page", type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter("page_size", openapi.IN_QUERY, description="Rows per page", type=openapi.TYPE_INTEGER),
+    ],
+)
+@api_view(["GET"])
+@capability_required(Capability.VIEW_SCORES)
+def get_quiz_leaderboard(request):
+    """
+    This view retrieves one page of the leaderboard of a quiz, ordered by score and then completion time.
+
+    Returns:
+        Response: The response containing the ranked participants and the cursor of the next page.
+    """
+    user = request.user
+    quiz_id = request.query_params.get("quiz_id")
+    cursor = request.query_params.get("cursor")
+
+    try:
+        page_size = int(request.query_params.get("page_size", 50))
+    except ValueError:
+        return Response({"error": "Page size must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= page_size <= 500:
+        return Response({"error": "Page size must be between 1 and 500."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        quiz = Quiz.objects.get(id=quiz_id)
+    except Quiz.DoesNotExist:
+        return Response({"error": "Quiz does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    if quiz.created_by_id != user.id:
+        return Response({"error": "You do not have permission to view this quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        page = get_leaderboard_page(quiz, cursor=cursor, page_size=page_size)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(page)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("quiz_id", openapi.IN_QUERY, description="ID of the quiz", type=openapi.TYPE_INTEGER),
+        openapi.Parameter(
+            "file_format", openapi.IN_QUERY, description="Export format, csv or ndjson", type=openapi.TYPE_STRING
+        ),
+    ],
+)
+@api_view(["GET"])
+@capability_required(Capability.VIEW_SCORES)
+def export_quiz_scores(request):
+    """
+    This view streams the scores of all participants in a quiz as CSV or NDJSON.
+
+    Returns:
+        StreamingHttpResponse: The response streaming one row per participant.
+    """
+    user = request.user
+    quiz_id = request.query_params.get("quiz_id")
+    file_format = request.query_params.get("file_format", "csv")
+
+    try:
+        quiz = Quiz.objects.select_related("status").get(id=quiz_id)
+    except Quiz.DoesNotExist:
+        return Response({"error": "Quiz does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    if quiz.created_by_id != user.id:
+        return Response({"error": "You do not have permission to view this quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+    if file_format not in EXPORT_FORMATS:
+        return Response({"error": "Format must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+    stream, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(stream(iter_quiz_scores(quiz)), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="quiz_{quiz.id}_scores.{file_format}"'
+    return response
 
 
 @swagger_auto_schema(
@@ -533,6 +817,7 @@ def get_quiz_scores(request):
     responses={200: QuestionSerializer},
 )
 @api_view(["GET"])
+@throttle_classes(QUIZ_THROTTLES)
 def get_next_question(request):
     """
     This view retrieves the next question for a user in a quiz.
@@ -542,34 +827,92 @@ def get_next_question(request):
     """
     user = request.user
     quiz_id = request.query_params.get("quiz_id")
-    quiz = Quiz.objects.get(id=quiz_id)
-    user_progress = UserQuizProgress.objects.get(user=user, quiz=quiz)
+    user_progress = UserQuizProgress.objects.filter(user=user, quiz=quiz_id).first()
 
     if not user_progress:
         return Response({"error": "User does not have access to the quiz."}, status=status.HTTP_403_FORBIDDEN)
 
-    last_answered_question = user_progress.last_answered_question
-    questions = Question.objects.filter(quiz=quiz).order_by("created_at")
-
-    if last_answered_question:
-        answered_questions = AnsweredQuestion.objects.filter(progress=user_progress)
-        next_question = questions.filter(created_at__gt=last_answered_question.created_at).first()
-        if AnsweredQuestion.objects.filter(progress=user_progress, question=next_question).exists():
-            next_question = (
-                questions.filter(created_at__gt=last_answered_question.created_at)
-                .exclude(id__in=[a.question.id for a in answered_questions])
-                .first()
-            )
-        if not next_question:
-            user_progress.completed = True
-            return Response({"message": "Quiz completed."}, status=status.HTTP_200_OK)
-    else:
-        next_question = questions.first()
+    next_question = find_next_question(user_progress)
+    if not next_question:
+        return Response({"message": "Quiz completed."}, status=status.HTTP_200_OK)
 
     serializer = QuestionSerializer(next_question)
     return Response(serializer.data)
 
 
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("quiz_id", openapi.IN_QUERY, description="ID of the quiz", type=openapi.TYPE_INTEGER)
+    ],
+    responses={200: NextQuestionSerializer},
+)
+@api_view(["GET"])
+@throttle_classes(QUIZ_THROTTLES)
+def get_next_question_with_answers(request):
+    """
+    This view retrieves the next question for a user in a quiz together with its answer options.
+
+    Returns:
+        Response: The response containing the next question and its answers.
+    """
+    user = request.user
+    quiz_id = request.query_params.get("quiz_id")
+    user_progress = UserQuizProgress.objects.select_related("quiz__status").filter(user=user, quiz=quiz_id).first()
+
+    if not user_progress:
+        return Response({"error": "User does not have access to the quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+    # Check if quiz is Published
+    if user_progress.quiz.status.name != "Published":
+        return Response({"error": "Quiz is not published."}, status=status.HTTP_400_BAD_REQUEST)
+
+    next_question = find_next_question(user_progress)
+    if not next_question:
+        return Response({"message": "Quiz completed."}, status=status.HTTP_200_OK)
+
+    serializer = NextQuestionSerializer(next_question)
+    return Response(serializer.data)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("quiz_id", openapi.IN_QUERY, description="ID of the quiz", type=openapi.TYPE_INTEGER)
+    ],
+    responses={200: QuizSnapshotSerializer},
+)
+@api_view(["GET"])
+def get_quiz_snapshot(request):
+    """
+    This view retrieves the whole content of a published quiz for an assigned participant.
+
+    Returns:
+        HttpResponse: The response containing the questions and answers of the quiz, or an empty 304 response if the
+        client already has the current snapshot.
+    """
+    user = request.user
+    quiz_id = request.query_params.get("quiz_id")
+    assigned_quiz = AssignedQuiz.objects.select_related("quiz__status").filter(user=user, quiz=quiz_id).first()
+
+    if not assigned_quiz:
+        return Response({"error": "User is not assigned to the quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+    # Check if quiz is Published
+    if assigned_quiz.quiz.status.name != "Published":
+        return Response({"error": "Quiz is not published."}, status=status.HTTP_400_BAD_REQUEST)
+
+    snapshot = get_snapshot(assigned_quiz.quiz)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and (if_none_match.strip() == "*" or snapshot.etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot.content, content_type="application/json")
+    response["ETag"] = snapshot.etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @swagger_auto_schema(
     method="get",
     manual_parameters=[
@@ -587,7 +930,7 @@ def get_answers_by_question(request):
     """
     question_id = request.query_params.get("question_id")
     user = request.user
-    quiz = Question.objects.get(id=question_id).quiz
+    quiz = Question.objects.select_related("quiz__status").get(id=question_id).quiz
 
     # Check if quiz is Published
     if quiz.status.name != "Published":
@@ -599,20 +942,165 @@ def get_answers_by_question(request):
         return Response({"error": "User does not have access to the question."}, status=status.HTTP_403_FORBIDDEN)
 
     answers = Answer.objects.filter(question=question_id)
-    serializer = AnswerSerializer(answers, many=True)
-    return Response(serializer.data)
+    return conditional_response(
+        request, content_version(answers), lambda: Response(AnswerSerializer(answers, many=True).data)
+    )
 
 
-@swagger_auto_schema(method="get", responses={200: UserSerializer(many=True)})
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter(
+            "search", openapi.IN_QUERY, description="Prefix of the username or email", type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter("role", openapi.IN_QUERY, description="Name of the role", type=openapi.TYPE_STRING),
+        openapi.Parameter(
+            "cursor", openapi.IN_QUERY, description="Cursor returned with the previous page", type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter("page_size", openapi.IN_QUERY, description="Users per page", type=openapi.TYPE_INTEGER),
+    ],
+)
 @api_view(["GET"])
-@role_required("Creator")
+@capability_required(Capability.VIEW_USERS)
 def get_all_users(request):
     """
-    This view retrieves all users.
+    This view retrieves one page of users, ordered by username and optionally searched by prefix and role.
 
     Returns:
-        Response: The response containing all users.
+        Response: The response containing the users and the cursor of the next page.
     """
-    users = User.objects.all()
-    serializer = UserSerializer(users, many=True)
+    search = request.query_params.get("search")
+    role = request.query_params.get("role")
+    cursor = request.query_params.get("cursor")
+
+    try:
+        page_size = int(request.query_params.get("page_size", 50))
+    except ValueError:
+        return Response({"error": "Page size must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= page_size <= 500:
+        return Response({"error": "Page size must be between 1 and 500."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        page = get_users_page(search=search, role=role, cursor=cursor, page_size=page_size)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"results": UserSerializer(page["results"], many=True).data, "next_cursor": page["next_cursor"]})
+
+
+@swagger_auto_schema(
+    method="post",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            "quiz_id": openapi.Schema(type=openapi.TYPE_INTEGER, description="ID of the quiz"),
+            "kind": openapi.Schema(type=openapi.TYPE_STRING, description="Kind of the job"),
+        },
+    ),
+    responses={202: JobSerializer},
+)
+@api_view(["POST"])
+@capability_required(Capability.RUN_JOBS)
+def create_job(request):
+    """
+    This view queues a background job for a quiz.
+
+    Returns:
+        Response: The response containing the queued job.
+    """
+    quiz_id = request.data.get("quiz_id")
+    kind = request.data.get("kind")
+
+    try:
+        quiz = Quiz.objects.get(id=quiz_id)
+    except Quiz.DoesNotExist:
+        return Response({"error": "Quiz does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    if quiz.created_by_id != request.user.id:
+        return Response(
+            {"error": "You do not have permission to perform this action."}, status=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        job = enqueue_job(kind, quiz, request.user)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = JobSerializer(job)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("job_id", openapi.IN_QUERY, description="ID of the job", type=openapi.TYPE_INTEGER)
+    ],
+    responses={200: JobSerializer},
+)
+@api_view(["GET"])
+def get_job_status(request):
+    """
+    This view retrieves the status of a background job.
+
+    Returns:
+        Response: The response containing the job.
+    """
+    job_id = request.query_params.get("job_id")
+
+    try:
+        job = Job.objects.defer("result").get(id=job_id, created_by=request.user)
+    except Job.DoesNotExist:
+        return Response({"error": "Job does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = JobSerializer(job)
     return Response(serializer.data)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("job_id", openapi.IN_QUERY, description="ID of the job", type=openapi.TYPE_INTEGER)
+    ],
+)
+@api_view(["GET"])
+def get_job_result(request):
+    """
+    This view retrieves the result of a finished background job.
+
+    Returns:
+        Response: The response containing the result of the job.
+    """
+    job_id = request.query_params.get("job_id")
+
+    try:
+        job = Job.objects.get(id=job_id, created_by=request.user)
+    except Job.DoesNotExist:
+        return Response({"error": "Job does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+    if job.status == Job.FAILED:
+        return Response({"error": "Job failed."}, status=status.HTTP_409_CONFLICT)
+    if job.status != Job.SUCCEEDED:
+        return Response({"error": "Job is not finished yet."}, status=status.HTTP_409_CONFLICT)
+
+    return Response(job.result)
+
+
+@swagger_auto_schema(method="get")
+@api_view(["GET"])
+@capability_required(Capability.VIEW_STATS)
+def get_runtime_stats(request):
+    """
+    This view retrieves the counters of this server process, like the requests allowed and rejected by the throttles
+    and the hit rates of the in-process caches.
+
+    Returns:
+        Response: The response containing the counters.
+    """
+    caches = {
+        "tokens": tokens.local.stats(),
+        "roles": role_cache.stats(),
+        "answer_keys": answer_keys.local.stats(),
+        "item_analyses": item_analyses.local.stats(),
+        "snapshots": snapshots.local.stats(),
+        "question_quizzes": question_quizzes.stats(),
+    }
+    return Response({"throttles": throttle_stats(), "caches": caches})
@@ -5,4 +5,5 @@ python manage.py migrate
 python manage.py collectstatic --noinput
 python manage.py createsuperuser --noinput
 python manage.py init_db
-python manage.py runserver 0.0.0.0:8000
+# served over ASGI, the live scoreboards (stream_quiz_scores) keep their connections open
+uvicorn oper.asgi:application --host 0.0.0.0 --port 8000 --reload